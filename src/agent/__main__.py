@@ -32,7 +32,12 @@ def main() -> None:
     except ImportError:
         console.print("[yellow]Warning: Some tools not available[/]")
 
-    asyncio.run(agent.run(goal))
+    asyncio.run(_run(agent, goal))
+
+
+async def _run(agent: Agent, goal: str) -> None:
+    async with agent:
+        await agent.run(goal)
 
 
 if __name__ == "__main__":
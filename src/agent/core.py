@@ -3,6 +3,8 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import AsyncIterator
+from contextlib import aclosing
 from datetime import datetime, timezone
 from typing import Any
 
@@ -16,6 +18,8 @@ from .models import (
     AgentState,
     ApprovalDecision,
     AuditEntry,
+    Plan,
+    Step,
     StepStatus,
     ToolResult,
 )
@@ -33,6 +37,15 @@ class Agent:
         agent = Agent()
         agent.register_tool("github", GitHubTool())
         result = await agent.run("Create a fibonacci module with tests")
+        await agent.aclose()  # or use ``async with Agent() as agent:``
+
+    With ``concurrent=True`` independent steps (per ``Step.depends_on``) are
+    dispatched in parallel through the executor's DAG scheduler; the audit
+    trail is still recorded in plan order.
+
+    With ``streaming=True`` the plan is streamed from ``Planner.stream_plan``
+    and each step starts as soon as it has been generated (and, when
+    concurrent, its dependencies are done) instead of after the whole plan.
     """
 
     def __init__(
@@ -43,6 +56,8 @@ class Agent:
         guardrails: Any | None = None,
         max_steps: int = 20,
         timeout_seconds: int = 300,
+        concurrent: bool = False,
+        streaming: bool = False,
     ):
         self.planner = planner or Planner()
         self.executor = executor or Executor()
@@ -50,10 +65,32 @@ class Agent:
         self.guardrails = guardrails
         self._max_steps = max_steps
         self._timeout = timeout_seconds
+        self._concurrent = concurrent
+        self._streaming = streaming
+
+    def register_tool(
+        self,
+        name: str,
+        tool: object,
+        max_concurrency: int | None = None,
+        max_queue: int | None = None,
+    ) -> None:
+        """Register an MCP tool with the executor, optionally behind a bulkhead."""
+        self.executor.register_tool(
+            name, tool, max_concurrency=max_concurrency, max_queue=max_queue
+        )
+        if isinstance(self.planner, Planner):
+            self.planner.set_tools(self.executor.tools)
 
-    def register_tool(self, name: str, tool: object) -> None:
-        """Register an MCP tool with the executor."""
-        self.executor.register_tool(name, tool)
+    async def aclose(self) -> None:
+        """Release resources held by registered tools (HTTP pools, workers)."""
+        await self.executor.aclose()
+
+    async def __aenter__(self) -> Agent:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
 
     async def run(self, goal: str, context: dict[str, Any] | None = None) -> AgentState:
         """Execute the full agent loop for a given goal."""
@@ -65,96 +102,209 @@ class Agent:
 
         console.print(Panel(f"[bold blue]Goal:[/] {goal}", title="🤖 Agent Started"))
 
-        # Phase 1: Plan
-        console.print("\n[bold yellow]📋 Phase 1: Planning...[/]")
-        plan = await self.planner.create_plan(goal, context)
-        state.plan = plan
+        if self._streaming:
+            # Phases 1 and 2 overlap: steps run as the planner emits them
+            console.print("\n[bold yellow]📋⚡ Planning and executing...[/]")
+            plan = state.plan = Plan(goal=goal)
+            await self._execute_stream(self.planner.stream_plan(goal, context), state)
+            if not plan.steps:
+                console.print("[red]No steps generated. Aborting.[/]")
+                state.finished_at = datetime.now(timezone.utc)
+                return state
+        else:
+            # Phase 1: Plan
+            console.print("\n[bold yellow]📋 Phase 1: Planning...[/]")
+            plan = await self.planner.create_plan(goal, context)
+            state.plan = plan
+
+            self._print_plan(plan)
+
+            if not plan.steps:
+                console.print("[red]No steps generated. Aborting.[/]")
+                state.finished_at = datetime.now(timezone.utc)
+                return state
+
+            # Phase 2: Execute
+            console.print("\n[bold yellow]⚡ Phase 2: Executing...[/]")
+            if self._concurrent:
+                await self._execute_concurrently(plan.steps, state)
+            else:
+                await self._execute_sequentially(plan.steps, state)
+
+        # Final verification
+        console.print("\n[bold yellow]🔍 Phase 3: Verifying...[/]")
+        final = await self.verifier.verify_plan_completion(goal, plan.steps)
 
-        self._print_plan(plan)
+        state.finished_at = datetime.now(timezone.utc)
 
-        if not plan.steps:
-            console.print("[red]No steps generated. Aborting.[/]")
-            state.finished_at = datetime.now(timezone.utc)
-            return state
+        # Phase 4: Report
+        self._print_report(state, final)
+
+        return state
 
-        # Phase 2: Execute
-        console.print("\n[bold yellow]⚡ Phase 2: Executing...[/]")
-        for i, step in enumerate(plan.steps):
+    async def _execute_sequentially(self, steps: list[Step], state: AgentState) -> None:
+        """Run steps one at a time in plan order."""
+        for i, step in enumerate(steps):
             if i >= self._max_steps:
                 console.print(f"[red]Max steps ({self._max_steps}) reached. Stopping.[/]")
                 break
 
             state.current_step_index = i
-            console.print(f"\n  [cyan]Step {i + 1}/{len(plan.steps)}:[/] {step.description}")
-
-            # Guardrails check
-            if self.guardrails:
-                decision = self.guardrails.check_action(step.tool_name, step.tool_params)
-                if decision == ApprovalDecision.DENY:
-                    console.print(f"  [red]⛔ Denied by guardrails[/]")
-                    step.status = StepStatus.SKIPPED
-                    state.audit_trail.append(
-                        AuditEntry(
-                            action=step.description,
-                            tool_name=step.tool_name,
-                            tool_params=step.tool_params,
-                            decision=ApprovalDecision.DENY,
-                            rationale="Blocked by guardrail policy",
-                        )
-                    )
-                    continue
-                elif decision == ApprovalDecision.REQUIRE_APPROVAL:
-                    console.print(f"  [yellow]⚠️  Requires human approval (auto-approving in demo)[/]")
-
-            # Execute
-            result = await self.executor.execute_step(step)
-
-            # Audit
-            risk = self._assess_risk(step.tool_name, step.tool_params)
-            state.audit_trail.append(
-                AuditEntry(
+            entry = await self._process_step(step, f"{i + 1}/{len(steps)}", state.goal)
+            self._record(state, step, entry)
+
+    async def _execute_concurrently(self, steps: list[Step], state: AgentState) -> None:
+        """Run independent steps in parallel, honouring ``depends_on``."""
+        if len(steps) > self._max_steps:
+            console.print(f"[red]Max steps ({self._max_steps}) reached. Stopping.[/]")
+            steps = steps[: self._max_steps]
+
+        index = {step.id: i for i, step in enumerate(steps)}
+        entries: dict[str, AuditEntry] = {}
+
+        async def run_step(step: Step) -> ToolResult:
+            state.current_step_index = index[step.id]
+            label = f"{index[step.id] + 1}/{len(steps)}"
+            entry = await self._process_step(step, label, state.goal)
+            entries[step.id] = entry
+            return entry.result or ToolResult(success=False, error=entry.rationale)
+
+        await self.executor.execute_plan_steps(steps, run_step=run_step)
+        self._record_in_order(steps, entries, state)
+
+    async def _execute_stream(self, stream: AsyncIterator[Step], state: AgentState) -> None:
+        """Run steps as they stream in from the planner."""
+        plan = state.plan
+        assert plan is not None
+        index: dict[str, int] = {}
+        entries: dict[str, AuditEntry] = {}
+
+        async def arrivals() -> AsyncIterator[Step]:
+            async with aclosing(stream) as steps:
+                async for step in steps:
+                    if len(plan.steps) >= self._max_steps:
+                        console.print(f"[red]Max steps ({self._max_steps}) reached. Stopping.[/]")
+                        break
+                    index[step.id] = len(plan.steps)
+                    plan.steps.append(step)
+                    yield step
+
+        async def run_step(step: Step) -> ToolResult:
+            state.current_step_index = index[step.id]
+            entry = await self._process_step(step, str(index[step.id] + 1), state.goal)
+            entries[step.id] = entry
+            return entry.result or ToolResult(success=False, error=entry.rationale)
+
+        if self._concurrent:
+            await self.executor.execute_plan_stream(arrivals(), run_step=run_step)
+            self._record_in_order(plan.steps, entries, state)
+            return
+
+        async with aclosing(arrivals()) as steps:
+            async for step in steps:
+                await run_step(step)
+                self._record(state, step, entries[step.id])
+
+    def _record_in_order(
+        self, steps: list[Step], entries: dict[str, AuditEntry], state: AgentState
+    ) -> None:
+        """Record in plan order so the trail reads the same as a serial run."""
+        for step in steps:
+            entry = entries.get(step.id)
+            if entry is None:
+                # Never dispatched: a dependency failed or was denied.
+                error = step.result.error if step.result else "Skipped"
+                console.print(f"\n  [yellow]⏭  Skipped:[/] {step.description} ({error})")
+                entry = AuditEntry(
                     action=step.description,
                     tool_name=step.tool_name,
                     tool_params=step.tool_params,
-                    result=result,
-                    risk_level=risk,
+                    result=step.result,
+                    risk_level=self._assess_risk(step.tool_name, step.tool_params),
                     decision=ApprovalDecision.AUTO_APPROVE,
-                    rationale="Executed successfully" if result.success else f"Failed: {result.error}",
+                    rationale=error or "Skipped",
                 )
-            )
-
-            if result.success:
-                state.completed_steps += 1
-                console.print(f"  [green]✅ Success[/] ({result.duration_ms:.0f}ms)")
-            else:
-                state.failed_steps += 1
-                console.print(f"  [red]❌ Failed: {result.error}[/]")
-
-            # Phase 3: Verify
-            verification = await self.verifier.verify_step(step, goal)
-            if not verification.passed and verification.should_retry:
-                console.print(f"  [yellow]🔄 Verification failed, will retry in next cycle[/]")
-
-        # Final verification
-        console.print("\n[bold yellow]🔍 Phase 3: Verifying...[/]")
-        final = await self.verifier.verify_plan_completion(goal, plan.steps)
-
-        state.finished_at = datetime.now(timezone.utc)
-
-        # Phase 4: Report
-        self._print_report(state, final)
+            self._record(state, step, entry)
+
+    async def _process_step(self, step: Step, label: str, goal: str) -> AuditEntry:
+        """Run one step through guardrails, execution and verification."""
+        console.print(f"\n  [cyan]Step {label}:[/] {step.description}")
+
+        # Guardrails check
+        if self.guardrails:
+            decision = self.guardrails.check_action(step.tool_name, step.tool_params)
+            if decision == ApprovalDecision.DENY:
+                console.print(f"  [red]⛔ Denied by guardrails[/]")
+                step.status = StepStatus.SKIPPED
+                return AuditEntry(
+                    action=step.description,
+                    tool_name=step.tool_name,
+                    tool_params=step.tool_params,
+                    decision=ApprovalDecision.DENY,
+                    rationale="Blocked by guardrail policy",
+                )
+            elif decision == ApprovalDecision.REQUIRE_APPROVAL:
+                console.print(f"  [yellow]⚠️  Requires human approval (auto-approving in demo)[/]")
+
+        # Execute
+        result = await self.executor.execute_step(step)
+
+        if result.success:
+            console.print(f"  [green]✅ Success[/] ({result.duration_ms:.0f}ms)")
+        else:
+            console.print(f"  [red]❌ Failed: {result.error}[/]")
+
+        # Phase 3: Verify
+        verification = await self.verifier.verify_step(step, goal)
+        if not verification.passed and verification.should_retry:
+            console.print(f"  [yellow]🔄 Verification failed, will retry in next cycle[/]")
+
+        # Audit
+        risk = self._assess_risk(step.tool_name, step.tool_params)
+        return AuditEntry(
+            action=step.description,
+            tool_name=step.tool_name,
+            tool_params=step.tool_params,
+            result=result,
+            risk_level=risk,
+            decision=ApprovalDecision.AUTO_APPROVE,
+            rationale="Executed successfully" if result.success else f"Failed: {result.error}",
+        )
 
-        return state
+    def _record(self, state: AgentState, step: Step, entry: AuditEntry) -> None:
+        """Append an audit entry and update the step counters."""
+        state.audit_trail.append(entry)
+        if step.status == StepStatus.SKIPPED or entry.result is None:
+            return
+        if entry.result.success:
+            state.completed_steps += 1
+        else:
+            state.failed_steps += 1
 
     def _assess_risk(self, tool_name: str, params: dict) -> ActionRisk:
         """Assess the risk level of a tool action."""
         high_risk_tools = {"code_executor"}
-        medium_risk_actions = {"write", "delete", "create_repo", "create_file"}
+        medium_risk_actions = {
+            "write",
+            "write_open",
+            "write_close",
+            "delete",
+            "restore",
+            "create_repo",
+            "create_file",
+            "commit_files",
+        }
 
         if tool_name in high_risk_tools:
             return ActionRisk.HIGH
 
         action = params.get("action", "")
+        if action == "batch" and params.get("ops"):
+            ops = params["ops"]
+            if not isinstance(ops, list) or not all(isinstance(op, dict) for op in ops):
+                return ActionRisk.HIGH
+            risks = [self._assess_risk(tool_name, op) for op in ops]
+            return max(risks, key=list(ActionRisk).index)
         if action in medium_risk_actions:
             return ActionRisk.MEDIUM
 
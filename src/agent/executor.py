@@ -5,21 +5,100 @@ from __future__ import annotations
 import asyncio
 import logging
 import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
 
 from .models import Step, StepStatus, ToolResult
 
 logger = logging.getLogger(__name__)
 
 
+class BulkheadFullError(RuntimeError):
+    """Raised when a tool's bulkhead queue is already at capacity."""
+
+
+class Bulkhead:
+    """Semaphore-style bulkhead isolating one tool from the others.
+
+    At most ``max_concurrency`` calls run at once; up to ``max_queue`` more
+    may wait for a slot (unbounded when ``None``). Calls beyond that are
+    rejected immediately with ``BulkheadFullError``.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int | None = None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._queued = 0
+
+    @property
+    def queued(self) -> int:
+        """Number of calls currently waiting for a slot."""
+        return self._queued
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """Hold a slot for the duration of the block; yields the queue wait in ms."""
+        if self._semaphore.locked() and self.max_queue is not None:
+            if self._queued >= self.max_queue:
+                raise BulkheadFullError(
+                    f"Bulkhead full: {self.max_concurrency} running, {self._queued} queued"
+                )
+
+        start = time.monotonic()
+        self._queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+        try:
+            yield (time.monotonic() - start) * 1000
+        finally:
+            self._semaphore.release()
+
+
 class Executor:
     """Executes plan steps by dispatching to registered MCP tools."""
 
-    def __init__(self, tools: dict | None = None):
+    def __init__(self, tools: dict | None = None, max_concurrency: int = 4):
         self._tools: dict = tools or {}
+        self._bulkheads: dict[str, Bulkhead] = {}
+        self._max_concurrency = max(1, max_concurrency)
+
+    @property
+    def tools(self) -> dict[str, object]:
+        """Registered tools by name."""
+        return dict(self._tools)
+
+    def register_tool(
+        self,
+        name: str,
+        tool: object,
+        max_concurrency: int | None = None,
+        max_queue: int | None = None,
+    ) -> None:
+        """Register an MCP tool by name.
 
-    def register_tool(self, name: str, tool: object) -> None:
-        """Register an MCP tool by name."""
+        ``max_concurrency`` puts the tool behind its own bulkhead so a slow
+        tool cannot starve the rest; ``max_queue`` bounds how many calls may
+        wait for it before new ones are rejected.
+        """
         self._tools[name] = tool
+        if max_concurrency is not None:
+            self._bulkheads[name] = Bulkhead(max_concurrency, max_queue)
+        else:
+            self._bulkheads.pop(name, None)
+
+    async def aclose(self) -> None:
+        """Close every registered tool that holds long-lived resources."""
+        for name, tool in self._tools.items():
+            close = getattr(tool, "aclose", None)
+            if close is None:
+                continue
+            try:
+                await close()
+            except Exception as exc:
+                logger.warning("Failed to close tool '%s': %s", name, exc)
 
     async def execute_step(self, step: Step) -> ToolResult:
         """Execute a single step, with retry logic."""
@@ -35,10 +114,8 @@ class Executor:
 
         for attempt in range(step.max_retries + 1):
             try:
-                start = time.monotonic()
-                result = await tool.execute(step.tool_params)
-                elapsed = (time.monotonic() - start) * 1000
-                result.duration_ms = elapsed
+                result = await self._call_tool(step.tool_name, tool, step.tool_params)
+                elapsed = result.duration_ms
 
                 if result.success:
                     step.status = StepStatus.SUCCESS
@@ -79,28 +156,136 @@ class Executor:
         step.result = fail_result
         return fail_result
 
-    async def execute_plan_steps(self, steps: list[Step]) -> list[ToolResult]:
-        """Execute steps sequentially, respecting dependencies."""
-        results: list[ToolResult] = []
-        completed_ids: set[str] = set()
-
-        for step in steps:
-            # Check dependencies
-            unmet = [d for d in step.depends_on if d not in completed_ids]
-            if unmet:
-                step.status = StepStatus.SKIPPED
-                result = ToolResult(
-                    success=False,
-                    error=f"Skipped: unmet dependencies {unmet}",
-                )
-                step.result = result
-                results.append(result)
-                continue
+    async def _call_tool(self, name: str, tool: object, params: dict) -> ToolResult:
+        """Invoke a tool once, through its bulkhead when one is configured."""
+        bulkhead = self._bulkheads.get(name)
+        if bulkhead is None:
+            start = time.monotonic()
+            result = await tool.execute(params)
+            result.duration_ms = (time.monotonic() - start) * 1000
+            return result
+
+        async with bulkhead.slot() as waited_ms:
+            start = time.monotonic()
+            result = await tool.execute(params)
+            result.duration_ms = (time.monotonic() - start) * 1000
+        result.metadata["queue_wait_ms"] = waited_ms
+        return result
+
+    async def execute_plan_steps(
+        self,
+        steps: list[Step],
+        run_step: Callable[[Step], Awaitable[ToolResult]] | None = None,
+    ) -> list[ToolResult]:
+        """Execute steps as a dependency graph built from ``depends_on``.
+
+        Every step whose dependencies have succeeded is launched immediately,
+        with at most ``max_concurrency`` steps running at once. When a step
+        fails, only its transitive dependents are skipped; unrelated branches
+        keep running. Results are returned in the same order as ``steps``.
+
+        ``run_step`` replaces ``execute_step`` as the per-step coroutine, so
+        callers can wrap execution with their own checks (e.g. guardrails).
+        """
+
+        async def emit() -> AsyncIterator[Step]:
+            for step in steps:
+                yield step
+
+        return await self.execute_plan_stream(emit(), run_step=run_step)
+
+    async def execute_plan_stream(
+        self,
+        steps: AsyncIterator[Step],
+        run_step: Callable[[Step], Awaitable[ToolResult]] | None = None,
+    ) -> list[ToolResult]:
+        """Like ``execute_plan_steps``, but for steps that are still arriving.
+
+        Each step joins the dependency graph as soon as ``steps`` yields it
+        and starts right away if its dependencies have already succeeded, so
+        execution overlaps with plan generation. A dependency on a step that
+        has not arrived yet waits for it, and counts as unmet only once the
+        stream ends without it. Results are returned in arrival order.
+        """
+        run_one = run_step or self.execute_step
+        order: list[Step] = []
+        by_id: dict[str, Step] = {}
+        waiting: dict[str, Step] = {}
+        succeeded: set[str] = set()
+        blocked: set[str] = set()
+        results: dict[str, ToolResult] = {}
+        running: dict[asyncio.Future[ToolResult], Step] = {}
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        arrival: asyncio.Future[Step] | None = asyncio.ensure_future(anext(steps))
+
+        async def run(step: Step) -> ToolResult:
+            async with semaphore:
+                return await run_one(step)
+
+        def skip(step: Step, unmet: list[str]) -> None:
+            step.status = StepStatus.SKIPPED
+            result = ToolResult(
+                success=False,
+                error=f"Skipped: unmet dependencies {unmet}",
+            )
+            step.result = result
+            results[step.id] = result
+            blocked.add(step.id)
+            del waiting[step.id]
+
+        try:
+            while waiting or running or arrival:
+                # Skipping a step can block further dependents, so keep
+                # scanning until the ready set stops changing.
+                changed = True
+                while changed:
+                    changed = False
+                    for step in list(waiting.values()):
+                        unmet = [
+                            d for d in step.depends_on
+                            if d in blocked or (d not in by_id and arrival is None)
+                        ]
+                        if unmet:
+                            skip(step, unmet)
+                            changed = True
+                        elif all(d in succeeded for d in step.depends_on):
+                            del waiting[step.id]
+                            running[asyncio.create_task(run(step))] = step
 
-            result = await self.execute_step(step)
-            results.append(result)
+                if not running and arrival is None:
+                    # Nothing in flight, ready or still to come: the rest form a cycle.
+                    for step in list(waiting.values()):
+                        skip(step, [d for d in step.depends_on if d not in succeeded])
+                    break
 
-            if result.success:
-                completed_ids.add(step.id)
+                pending = set(running) | ({arrival} if arrival else set())
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is arrival:
+                        try:
+                            step = arrival.result()
+                        except StopAsyncIteration:
+                            arrival = None
+                            continue
+                        order.append(step)
+                        by_id[step.id] = waiting[step.id] = step
+                        arrival = asyncio.ensure_future(anext(steps))
+                        continue
+                    step = running.pop(task)
+                    result = task.result()
+                    results[step.id] = result
+                    if result.success:
+                        succeeded.add(step.id)
+                    else:
+                        blocked.add(step.id)
+        finally:
+            for task in running:
+                task.cancel()
+            if arrival is not None:
+                arrival.cancel()
+                await asyncio.gather(arrival, return_exceptions=True)
+            close = getattr(steps, "aclose", None)
+            if close is not None:
+                await close()
 
-        return results
+        return [results[step.id] for step in order]
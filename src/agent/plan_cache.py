@@ -0,0 +1,213 @@
+"""Persistent cache of planner output, keyed on everything that shapes a plan."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from .models import Step
+
+logger = logging.getLogger(__name__)
+
+# Cache files are named ``<key>.plan.json`` so a shared directory's other
+# JSON files are never pruned or cleared.
+SUFFIX = ".plan.json"
+
+
+class PlanCache:
+    """LRU + TTL cache of plans, optionally persisted as one JSON file per key.
+
+    Plans are stored as step templates (description, tool, params and
+    dependency *indices*) rather than ``Step`` objects, so every hit can be
+    materialised with fresh step IDs. Entries expire ``ttl_seconds`` after
+    they were stored (wall clock, so expiry survives restarts); at most
+    ``max_entries`` are kept in memory and on disk, evicting the least
+    recently used. Disk I/O runs in a worker thread.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        max_entries: int = 512,
+        ttl_seconds: float = 24 * 3600,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._memory: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._max_entries = max(1, max_entries)
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._dir = Path(cache_dir).expanduser() if cache_dir else None
+        self.hits = 0
+        self.misses = 0
+
+        if self._dir:
+            self._dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(
+        goal: str,
+        context: dict[str, Any] | None,
+        model: str,
+        prompt: str,
+        tools_fingerprint: str = "",
+    ) -> str:
+        """Hash the normalised goal, canonical context, model, prompt and tools."""
+        material = json.dumps(
+            {
+                "goal": " ".join(goal.split()),
+                "context": context or {},
+                "model": model,
+                "prompt": hashlib.sha256(prompt.encode()).hexdigest(),
+                "tools": tools_fingerprint,
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    async def get(self, key: str) -> list[Step] | None:
+        """Return fresh copies of the cached steps for ``key``, or None."""
+        entry = self._memory.get(key)
+        from_disk = entry is None and self._dir is not None
+        if from_disk:
+            entry = await asyncio.to_thread(self._load, self._path(key))
+        if entry is None or entry.get("key") != key:
+            self.misses += 1
+            return None
+        if entry["expires_at"] <= self._clock():
+            await self._forget(key)
+            self.misses += 1
+            return None
+
+        self._remember(key, entry)
+        if self._dir is not None and not from_disk:
+            # Keep the on-disk eviction order least-recently-used, too.
+            await asyncio.to_thread(_touch, self._path(key))
+        self.hits += 1
+        return _materialise(entry["steps"])
+
+    async def put(self, key: str, steps: list[Step]) -> None:
+        """Store ``steps`` under ``key`` in memory and on disk."""
+        entry = {"key": key, "expires_at": self._clock() + self._ttl, "steps": _template(steps)}
+        self._remember(key, entry)
+        if self._dir is not None:
+            await asyncio.to_thread(self._persist, self._path(key), entry)
+
+    async def clear(self) -> None:
+        """Drop every entry, in memory and on disk."""
+        self._memory.clear()
+        if self._dir is not None:
+            await asyncio.to_thread(self._clear_dir)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._memory),
+        }
+
+    def _remember(self, key: str, entry: dict[str, Any]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+
+    async def _forget(self, key: str) -> None:
+        self._memory.pop(key, None)
+        if self._dir is not None:
+            await asyncio.to_thread(self._path(key).unlink, missing_ok=True)
+
+    def _load(self, path: Path) -> dict[str, Any] | None:
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        _touch(path)
+        return entry
+
+    def _persist(self, path: Path, entry: dict[str, Any]) -> None:
+        self._write(path, entry)
+        self._prune()
+
+    def _clear_dir(self) -> None:
+        assert self._dir is not None
+        for path in self._dir.glob(f"*{SUFFIX}"):
+            path.unlink(missing_ok=True)
+
+    def _prune(self) -> None:
+        """Evict the oldest files once the directory outgrows ``max_entries``."""
+        assert self._dir is not None
+        try:
+            files = [(p.stat().st_mtime, p) for p in self._dir.glob(f"*{SUFFIX}")]
+        except OSError:
+            return
+        if len(files) <= self._max_entries:
+            return
+        for _, path in sorted(files)[: len(files) - self._max_entries]:
+            path.unlink(missing_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self._dir / f"{key}{SUFFIX}"  # type: ignore[operator]
+
+    def _write(self, path: Path, entry: dict[str, Any]) -> None:
+        """Write atomically so concurrent readers never see a partial file."""
+        try:
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        except OSError as e:
+            logger.warning("Failed to persist plan cache entry: %s", e)
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError) as e:
+            Path(tmp).unlink(missing_ok=True)
+            logger.warning("Failed to persist plan cache entry: %s", e)
+
+
+def _touch(path: Path) -> None:
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _template(steps: list[Step]) -> list[dict[str, Any]]:
+    """Turn steps into ID-free templates with index-based dependencies."""
+    index = {step.id: i for i, step in enumerate(steps)}
+    return [
+        {
+            "description": step.description,
+            "tool_name": step.tool_name,
+            "tool_params": step.tool_params,
+            "depends_on": [index[d] for d in step.depends_on if d in index],
+        }
+        for step in steps
+    ]
+
+
+def _materialise(templates: list[dict[str, Any]]) -> list[Step]:
+    """Build new ``Step`` objects (fresh IDs) from cached templates."""
+    steps: list[Step] = []
+    for item in templates:
+        steps.append(
+            Step(
+                description=item["description"],
+                tool_name=item["tool_name"],
+                tool_params=json.loads(json.dumps(item["tool_params"])),
+                depends_on=[steps[i].id for i in item["depends_on"] if i < len(steps)],
+            )
+        )
+    return steps
@@ -2,13 +2,16 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
+from collections.abc import AsyncIterator
 from typing import Any
 
 from openai import AsyncOpenAI
 
 from .models import Plan, Step
+from .plan_cache import PlanCache
 
 logger = logging.getLogger(__name__)
 
@@ -17,36 +20,74 @@ decompose it into concrete, ordered steps. Each step must specify:
 - description: what the step does
 - tool_name: which tool to use (github, filesystem, web_search, code_executor)
 - tool_params: parameters for the tool call
+- depends_on: (optional) 0-based indices of earlier steps that must finish first
 
 Available tools:
-- github: Actions on GitHub (create_repo, create_file, read_file, create_issue). Params: action, owner, repo, path, content, title, body
+- github: Actions on GitHub (create_repo, create_file, read_file, create_issue, commit_files). Params: action, owner, repo, path, content, title, body
+  Use commit_files (params: files=[{path, content}], branch, message) to add several files in one commit
 - filesystem: Local file operations (read, write, list, delete). Params: action, path, content
+  write accepts mode="append"; read accepts offset/max_bytes or start_line/max_lines and returns a cursor for the next page
+  Use walk (params: path, include/exclude globs, max_depth, type, limit) or glob (pattern) to list a whole subtree in one step
+  Use search (params: path, query, regex, ignore_case, context, include, max_matches) to find text instead of reading files one by one
+  Use batch (params: path, ops=[{action, path, content}, ...]) to do several read/write/mkdir/delete ops in one step
+  Use snapshot (params: snapshot=<id>) before risky changes and restore (snapshot=<id>) to roll the workspace back
 - web_search: Search the web. Params: query, max_results
+  Use queries=[query, ...] instead of query to run related searches in one step; results are merged by URL
 - code_executor: Run Python code in sandbox. Params: code, timeout_seconds
+  Use snippets=[code, ...] instead of code to run several small independent checks in one step
 
-Return a JSON array of steps. Each step: {"description": "...", "tool_name": "...", "tool_params": {...}}
+Return a JSON array of steps. Each step: {"description": "...", "tool_name": "...", "tool_params": {...}, "depends_on": [...]}
+Steps without depends_on may run in parallel with any other step, so list every real prerequisite.
 Return ONLY the JSON array, no markdown fences or explanation."""
 
 
 class Planner:
-    """Decomposes high-level goals into executable step plans."""
+    """Decomposes high-level goals into executable step plans.
 
-    def __init__(self, client: AsyncOpenAI | None = None, model: str = "gpt-4o"):
+    With a ``plan_cache``, plans are reused for repeat requests: the key
+    covers the normalised goal, canonical context, model, system prompt and
+    the fingerprint of the registered tools (see ``set_tools``), and every
+    hit returns new ``Step`` objects with fresh IDs.
+
+    ``stream_plan`` streams the completion and yields each step as soon as
+    its JSON object closes, so execution can start before the plan is done.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI | None = None,
+        model: str = "gpt-4o",
+        plan_cache: PlanCache | None = None,
+    ):
         self._client = client or AsyncOpenAI()
         self._model = model
+        self._plan_cache = plan_cache
+        self._tools_fingerprint = ""
+
+    def set_tools(self, tools: dict[str, Any]) -> None:
+        """Record the registered tools so cached plans are invalidated when they change."""
+        descriptors = {
+            name: (
+                tool.to_mcp_descriptor()
+                if hasattr(tool, "to_mcp_descriptor")
+                else type(tool).__name__
+            )
+            for name, tool in tools.items()
+        }
+        canonical = json.dumps(descriptors, sort_keys=True, default=str)
+        self._tools_fingerprint = hashlib.sha256(canonical.encode()).hexdigest()
 
     async def create_plan(self, goal: str, context: dict[str, Any] | None = None) -> Plan:
         """Create an execution plan for the given goal."""
-        messages = [
-            {"role": "system", "content": PLANNER_SYSTEM_PROMPT},
-            {"role": "user", "content": self._build_prompt(goal, context)},
-        ]
+        key, cached = await self._cached_steps(goal, context)
+        if cached is not None:
+            return Plan(goal=goal, steps=cached)
 
         logger.info("Planning for goal: %s", goal)
 
         response = await self._client.chat.completions.create(
             model=self._model,
-            messages=messages,
+            messages=self._messages(goal, context),
             temperature=0.2,
             max_tokens=2000,
         )
@@ -54,10 +95,73 @@ class Planner:
         raw = response.choices[0].message.content or "[]"
         steps = self._parse_steps(raw)
 
+        if key is not None and steps:
+            await self._plan_cache.put(key, steps)  # type: ignore[union-attr]
+
         plan = Plan(goal=goal, steps=steps)
         logger.info("Created plan with %d steps", len(steps))
         return plan
 
+    async def stream_plan(
+        self, goal: str, context: dict[str, Any] | None = None
+    ) -> AsyncIterator[Step]:
+        """Yield the plan's steps one by one while the LLM is still writing it."""
+        key, cached = await self._cached_steps(goal, context)
+        if cached is not None:
+            for step in cached:
+                yield step
+            return
+
+        logger.info("Streaming plan for goal: %s", goal)
+
+        stream = await self._client.chat.completions.create(
+            model=self._model,
+            messages=self._messages(goal, context),
+            temperature=0.2,
+            max_tokens=2000,
+            stream=True,
+        )
+        parser = StepStreamParser()
+        steps: list[Step] = []
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                for item in parser.feed(chunk.choices[0].delta.content or ""):
+                    step = self._build_step(item, steps)
+                    if step is not None:
+                        steps.append(step)
+                        yield step
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                await close()
+
+        # Only a plan that streamed to the end is worth caching.
+        if key is not None and steps:
+            await self._plan_cache.put(key, steps)  # type: ignore[union-attr]
+        logger.info("Streamed plan with %d steps", len(steps))
+
+    async def _cached_steps(
+        self, goal: str, context: dict[str, Any] | None
+    ) -> tuple[str | None, list[Step] | None]:
+        """Return the cache key for this request and any cached steps."""
+        if self._plan_cache is None:
+            return None, None
+        key = PlanCache.make_key(
+            goal, context, self._model, PLANNER_SYSTEM_PROMPT, self._tools_fingerprint
+        )
+        cached = await self._plan_cache.get(key)
+        if cached is not None:
+            logger.info("Reusing cached plan with %d steps", len(cached))
+        return key, cached
+
+    def _messages(self, goal: str, context: dict[str, Any] | None) -> list[dict[str, str]]:
+        return [
+            {"role": "system", "content": PLANNER_SYSTEM_PROMPT},
+            {"role": "user", "content": self._build_prompt(goal, context)},
+        ]
+
     def _build_prompt(self, goal: str, context: dict[str, Any] | None) -> str:
         prompt = f"Goal: {goal}"
         if context:
@@ -82,12 +186,82 @@ class Planner:
 
         steps: list[Step] = []
         for item in data:
-            if isinstance(item, dict):
-                steps.append(
-                    Step(
-                        description=item.get("description", "Unknown step"),
-                        tool_name=item.get("tool_name", "unknown"),
-                        tool_params=item.get("tool_params", {}),
-                    )
-                )
+            step = self._build_step(item, steps)
+            if step is not None:
+                steps.append(step)
         return steps
+
+    def _build_step(self, item: Any, earlier: list[Step]) -> Step | None:
+        """Turn one parsed plan entry into a Step (None for non-objects)."""
+        if not isinstance(item, dict):
+            return None
+        return Step(
+            description=item.get("description", "Unknown step"),
+            tool_name=item.get("tool_name", "unknown"),
+            tool_params=item.get("tool_params", {}),
+            depends_on=self._resolve_dependencies(item.get("depends_on"), earlier),
+        )
+
+    def _resolve_dependencies(self, indices: Any, earlier: list[Step]) -> list[str]:
+        """Map the LLM's step indices onto the IDs of already-parsed steps."""
+        if not isinstance(indices, list):
+            return []
+        return [
+            earlier[i].id
+            for i in indices
+            if isinstance(i, int) and not isinstance(i, bool) and 0 <= i < len(earlier)
+        ]
+
+
+class StepStreamParser:
+    """Incrementally extracts the top-level objects of a streamed JSON array.
+
+    Text before the opening ``[`` (e.g. a markdown fence) is ignored, and
+    ``feed`` returns every element object completed by the new text.
+    Strings are tracked so braces inside them don't count.
+    """
+
+    def __init__(self) -> None:
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buffer: list[str] = []
+
+    def feed(self, text: str) -> list[Any]:
+        items: list[Any] = []
+        for ch in text:
+            if self._done:
+                break
+            if not self._started:
+                self._started = ch == "["
+                continue
+
+            depth = self._depth
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                if not depth:
+                    self._done = True  # the array itself closed
+                    break
+                self._depth -= 1
+
+            if depth or self._depth:
+                self._buffer.append(ch)
+            if depth and not self._depth:
+                raw, self._buffer = "".join(self._buffer), []
+                try:
+                    items.append(json.loads(raw))
+                except json.JSONDecodeError:
+                    logger.error("Failed to parse streamed plan step: %s", raw[:200])
+        return items
@@ -15,15 +15,25 @@ DEFAULT_POLICY: dict[str, dict[str, ApprovalDecision]] = {
         "read_file": ApprovalDecision.AUTO_APPROVE,
         "list_repos": ApprovalDecision.AUTO_APPROVE,
         "create_file": ApprovalDecision.LOG_AND_APPROVE,
+        "commit_files": ApprovalDecision.LOG_AND_APPROVE,
         "create_repo": ApprovalDecision.REQUIRE_APPROVAL,
         "create_issue": ApprovalDecision.LOG_AND_APPROVE,
     },
     "filesystem": {
         "read": ApprovalDecision.AUTO_APPROVE,
         "list": ApprovalDecision.AUTO_APPROVE,
+        "walk": ApprovalDecision.AUTO_APPROVE,
+        "glob": ApprovalDecision.AUTO_APPROVE,
+        "search": ApprovalDecision.AUTO_APPROVE,
         "write": ApprovalDecision.LOG_AND_APPROVE,
+        "write_open": ApprovalDecision.LOG_AND_APPROVE,
+        "write_close": ApprovalDecision.LOG_AND_APPROVE,
         "mkdir": ApprovalDecision.LOG_AND_APPROVE,
         "delete": ApprovalDecision.REQUIRE_APPROVAL,
+        "batch": ApprovalDecision.LOG_AND_APPROVE,
+        "snapshot": ApprovalDecision.LOG_AND_APPROVE,
+        "snapshot_drop": ApprovalDecision.LOG_AND_APPROVE,
+        "restore": ApprovalDecision.REQUIRE_APPROVAL,
     },
     "web_search": {
         "*": ApprovalDecision.AUTO_APPROVE,
@@ -33,6 +43,14 @@ DEFAULT_POLICY: dict[str, dict[str, ApprovalDecision]] = {
     },
 }
 
+# Least to most restrictive; a batch gets the strictest decision of its ops.
+DECISION_SEVERITY = [
+    ApprovalDecision.AUTO_APPROVE,
+    ApprovalDecision.LOG_AND_APPROVE,
+    ApprovalDecision.REQUIRE_APPROVAL,
+    ApprovalDecision.DENY,
+]
+
 
 class Guardrails:
     """Policy-based action approval system.
@@ -58,6 +76,15 @@ class Guardrails:
         tool_policy = self._policy.get(tool_name, {})
         action = params.get("action", "*")
 
+        if action == "batch" and params.get("ops"):
+            ops = params["ops"]
+            if not isinstance(ops, list) or not all(isinstance(op, dict) for op in ops):
+                logger.warning("Malformed %s batch — requiring approval", tool_name)
+                return ApprovalDecision.REQUIRE_APPROVAL
+            # A batch is only as safe as its riskiest op
+            decisions = [self.check_action(tool_name, op) for op in ops]
+            return max(decisions, key=DECISION_SEVERITY.index)
+
         # Check specific action first, then wildcard
         decision = tool_policy.get(action) or tool_policy.get("*")
 
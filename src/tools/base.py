@@ -16,6 +16,7 @@ class MCPTool(ABC):
     - description: human-readable description
     - input_schema: JSON Schema describing accepted parameters
     - execute(): async method that performs the action
+    - aclose(): optional hook to release long-lived resources (clients, pools)
     """
 
     @property
@@ -41,6 +42,15 @@ class MCPTool(ABC):
         """Execute the tool with the given parameters."""
         ...
 
+    async def aclose(self) -> None:
+        """Release any long-lived resources held by the tool."""
+
+    async def __aenter__(self) -> MCPTool:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
     def to_mcp_descriptor(self) -> dict[str, Any]:
         """Return MCP-compatible tool descriptor."""
         return {
@@ -0,0 +1,166 @@
+"""Caches shared by the MCP tools."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Response files are named ``<digest>.response.json`` so pruning never
+# touches other JSON in a shared directory.
+RESPONSE_SUFFIX = ".response.json"
+
+
+class ResponseCache:
+    """HTTP response cache for conditional requests (ETag / Last-Modified).
+
+    Entries live in a bounded in-memory LRU and, when ``cache_dir`` is set,
+    are also persisted as one JSON file per key so later runs can revalidate
+    instead of refetching. At most ``max_entries`` files are kept on disk,
+    evicting the least recently used by mtime, and all disk I/O runs in a
+    worker thread. Entries are never served without revalidation; the cache
+    only supplies validators and the body for ``304`` responses.
+    """
+
+    def __init__(self, cache_dir: str | None = None, max_entries: int = 256):
+        self._memory: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._max_entries = max(1, max_entries)
+        self._dir = Path(cache_dir).expanduser() if cache_dir else None
+
+        if self._dir:
+            self._dir.mkdir(parents=True, exist_ok=True)
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Return the stored entry for ``key``, loading it from disk if needed."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry
+
+        if self._dir is None:
+            return None
+        entry = await asyncio.to_thread(self._load, self._path(key))
+        if entry is None or entry.get("key") != key:
+            return None
+        self._remember(key, entry)
+        return entry
+
+    async def put(self, key: str, entry: dict[str, Any]) -> None:
+        """Store ``entry`` under ``key`` in memory and on disk."""
+        entry = {**entry, "key": key}
+        self._remember(key, entry)
+        if self._dir is not None:
+            await asyncio.to_thread(self._persist, self._path(key), entry)
+
+    def _remember(self, key: str, entry: dict[str, Any]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return self._dir / f"{digest}{RESPONSE_SUFFIX}"  # type: ignore[operator]
+
+    def _load(self, path: Path) -> dict[str, Any] | None:
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            # Keep the on-disk eviction order least-recently-used, too.
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def _persist(self, path: Path, entry: dict[str, Any]) -> None:
+        self._write(path, entry)
+        self._prune()
+
+    def _prune(self) -> None:
+        """Evict the oldest files once the directory outgrows ``max_entries``."""
+        assert self._dir is not None
+        try:
+            files = [(p.stat().st_mtime, p) for p in self._dir.glob(f"*{RESPONSE_SUFFIX}")]
+        except OSError:
+            return
+        if len(files) <= self._max_entries:
+            return
+        for _, path in sorted(files)[: len(files) - self._max_entries]:
+            path.unlink(missing_ok=True)
+
+    def _write(self, path: Path, entry: dict[str, Any]) -> None:
+        """Write atomically so concurrent readers never see a partial file."""
+        try:
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        except OSError as e:
+            logger.warning("Failed to persist cache entry: %s", e)
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError) as e:
+            Path(tmp).unlink(missing_ok=True)
+            logger.warning("Failed to persist cache entry: %s", e)
+
+
+class TTLCache:
+    """In-memory LRU cache whose entries also expire after ``ttl_seconds``.
+
+    Tracks hits and misses so callers can report how much work it saves.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._max_entries = max(1, max_entries)
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the live value for ``key``, or None (counted as a miss)."""
+        item = self._entries.get(key)
+        if item is not None and item[0] > self._clock():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+        if item is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (self._clock() + self._ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
@@ -3,21 +3,144 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import inspect
+import json
+import os
 import tempfile
+from collections.abc import Callable
 from pathlib import Path
 from typing import Any
 
 from agent.models import ToolResult
 
 from .base import MCPTool
+from .cache import TTLCache
+from .sandbox_limits import ResourceLimits, remove_cgroup
+from .sandbox_pool import WORKER_SCRIPT, WorkerPool
+
+# Minimal environment for sandboxed interpreters
+SANDBOX_ENV = {
+    "PATH": "/usr/bin:/bin",
+    "HOME": "/tmp",
+    "PYTHONDONTWRITEBYTECODE": "1",
+}
+
+
+# Callback for live output: (stream name, line) -> None or awaitable.
+OutputCallback = Callable[[str, str], Any]
+
+_READ_CHUNK = 64 * 1024
+
+
+class _OutputCapture:
+    """Keeps at most ``limit`` bytes of one pipe and counts the rest.
+
+    Complete lines inside the captured window are forwarded to the
+    optional callback as they arrive.
+    """
+
+    def __init__(self, name: str, limit: int, on_line: OutputCallback | None):
+        self.name = name
+        self.total = 0
+        self.truncated = False
+        self._limit = limit
+        self._buffer = bytearray()
+        self._on_line = on_line
+        self._line_start = 0
+
+    def feed(self, chunk: bytes) -> bool:
+        """Store what fits under the cap; returns True once the cap is exceeded."""
+        self.total += len(chunk)
+        room = self._limit - len(self._buffer)
+        if len(chunk) > room:
+            self.truncated = True
+            chunk = chunk[: max(room, 0)]
+        self._buffer += chunk
+        return self.truncated
+
+    async def emit_lines(self, final: bool = False) -> None:
+        if self._on_line is None:
+            return
+        while True:
+            end = self._buffer.find(b"\n", self._line_start)
+            if end < 0:
+                break
+            await self._emit(self._buffer[self._line_start : end])
+            self._line_start = end + 1
+        if final and self._line_start < len(self._buffer):
+            await self._emit(self._buffer[self._line_start :])
+            self._line_start = len(self._buffer)
+
+    async def _emit(self, line: bytes) -> None:
+        assert self._on_line is not None
+        result = self._on_line(self.name, line.decode("utf-8", errors="replace"))
+        if inspect.isawaitable(result):
+            await result
+
+    def text(self, max_chars: int) -> str:
+        decoded = self._buffer.decode("utf-8", errors="replace")
+        if len(decoded) > max_chars:
+            self.truncated = True
+        return decoded[:max_chars]
 
 
 class CodeExecutorTool(MCPTool):
-    """MCP tool for executing Python code in a sandboxed subprocess."""
+    """MCP tool for executing Python code in a sandboxed subprocess.
+
+    With ``pool_size > 0`` snippets are dispatched to a pool of pre-spawned,
+    pre-warmed worker interpreters instead of cold-starting ``python3`` per
+    run. Workers are recycled after ``max_runs_per_worker`` runs, on timeout,
+    or when a snippet leaks process-wide state.
+
+    Without a pool, ``code_transport="stdin"`` (the default) pipes the code
+    to ``python3 -`` so no per-run disk I/O happens; ``"file"`` keeps the
+    old temp-file behaviour. Both pipes are read incrementally and capped at
+    ``max_output_bytes`` each, so memory stays bounded however much the code
+    prints. Past the cap the rest is drained and discarded, or the process is
+    killed when ``kill_on_output_overflow`` is set. ``on_output`` receives
+    each captured line as it arrives. Worker runs (pooled or ``snippets``)
+    report whole outputs, which get the same byte cap and callbacks once the
+    snippet finishes; an overflowing snippet fails instead of being killed.
+
+    ``limits`` applies ``setrlimit`` ceilings (CPU time, address space, open
+    files, processes) and optionally cgroup v2 limits to every run; a run
+    that hits one reports it in ``metadata["limit_exceeded"]``.
+
+    ``cache_size > 0`` enables a content-addressed cache of successful runs,
+    keyed on the code, interpreter version, sandbox environment and limits.
+    Repeats within ``cache_ttl_seconds`` return the stored result without
+    spawning anything; pass ``"cache": false`` to force a fresh run.
+    """
 
-    def __init__(self, timeout_seconds: int = 30, max_output_chars: int = 10000):
+    def __init__(
+        self,
+        timeout_seconds: int = 30,
+        max_output_chars: int = 10000,
+        pool_size: int = 0,
+        max_runs_per_worker: int = 50,
+        code_transport: str = "stdin",
+        max_output_bytes: int | None = None,
+        kill_on_output_overflow: bool = False,
+        on_output: OutputCallback | None = None,
+        limits: ResourceLimits | None = None,
+        cache_size: int = 0,
+        cache_ttl_seconds: float = 300.0,
+    ):
+        if code_transport not in ("stdin", "file"):
+            raise ValueError(f"Unknown code_transport: {code_transport}")
         self._timeout = timeout_seconds
         self._max_output = max_output_chars
+        self._transport = code_transport
+        # UTF-8 needs at most 4 bytes per character.
+        self._max_output_bytes = max_output_bytes or 4 * max_output_chars
+        self._kill_on_overflow = kill_on_output_overflow
+        self._on_output = on_output
+        self._limits = limits or ResourceLimits()
+        self._cache = TTLCache(cache_size, cache_ttl_seconds) if cache_size > 0 else None
+        self._interpreter: str | None = None
+        self._max_runs_per_worker = max_runs_per_worker
+        self._pool = self._make_pool(pool_size) if pool_size > 0 else None
 
     @property
     def name(self) -> str:
@@ -34,59 +157,325 @@ class CodeExecutorTool(MCPTool):
             "properties": {
                 "code": {"type": "string", "description": "Python code to execute"},
                 "timeout_seconds": {"type": "integer", "default": 30},
+                "cache": {
+                    "type": "boolean",
+                    "default": True,
+                    "description": "Set false to bypass the result cache",
+                },
+                "snippets": {
+                    "type": "array",
+                    "description": "Batch of snippets run in one worker, each isolated",
+                    "items": {
+                        "anyOf": [
+                            {"type": "string"},
+                            {
+                                "type": "object",
+                                "properties": {
+                                    "code": {"type": "string"},
+                                    "timeout_seconds": {"type": "integer"},
+                                },
+                                "required": ["code"],
+                            },
+                        ],
+                    },
+                },
             },
-            "required": ["code"],
+            "anyOf": [{"required": ["code"]}, {"required": ["snippets"]}],
         }
 
     async def execute(self, params: dict[str, Any]) -> ToolResult:
+        if "snippets" in params:
+            return await self._execute_batch(params)
+
         code = params.get("code", "")
         timeout = min(params.get("timeout_seconds", self._timeout), self._timeout)
 
         if not code.strip():
             return ToolResult(success=False, error="No code provided")
 
+        if self._cache is None or params.get("cache") is False:
+            return await self._execute_code(code, timeout)
+
+        key = await self._cache_key(code)
+        cached = self._cache.get(key)
+        if cached is not None:
+            result = cached.model_copy(deep=True)
+            result.metadata.update(cache="hit", cache_hit_rate=self._cache.stats()["hit_rate"])
+            return result
+
+        result = await self._execute_code(code, timeout)
+        # Only successful runs are cached: failures may be transient and retried.
+        if result.success:
+            self._cache.put(key, result.model_copy(deep=True))
+        result.metadata.update(cache="miss", cache_hit_rate=self._cache.stats()["hit_rate"])
+        return result
+
+    def cache_stats(self) -> dict[str, Any]:
+        """Hit/miss counters for the result cache (empty when disabled)."""
+        return self._cache.stats() if self._cache is not None else {}
+
+    async def _cache_key(self, code: str) -> str:
+        if self._interpreter is None:
+            self._interpreter = await self._interpreter_version()
+        material = {
+            "code": code,
+            "interpreter": self._interpreter,
+            "env": SANDBOX_ENV,
+            "cwd": os.getcwd(),
+            "limits": self._limits.describe(),
+            "max_output": self._max_output,
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True).encode()).hexdigest()
+
+    async def _interpreter_version(self) -> str:
+        proc = await asyncio.create_subprocess_exec(
+            "python3",
+            "-c",
+            "import sys; print(sys.executable, sys.version)",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env=SANDBOX_ENV,
+        )
+        stdout, _ = await proc.communicate()
+        return stdout.decode("utf-8", errors="replace").strip()
+
+    async def _execute_code(self, code: str, timeout: float) -> ToolResult:
+        if self._pool is not None:
+            return await self._execute_pooled(code, timeout)
+
+        if self._transport == "file":
+            return await self._execute_from_file(code, timeout)
+        return await self._execute_subprocess(["-"], timeout, stdin=code.encode("utf-8"))
+
+    async def _execute_from_file(self, code: str, timeout: float) -> ToolResult:
         # Write code to a temp file
         with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
             f.write(code)
             script_path = f.name
 
         try:
-            proc = await asyncio.create_subprocess_exec(
-                "python3",
-                script_path,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                # Resource limits via environment
-                env={
-                    "PATH": "/usr/bin:/bin",
-                    "HOME": "/tmp",
-                    "PYTHONDONTWRITEBYTECODE": "1",
-                },
-            )
+            return await self._execute_subprocess([script_path], timeout)
+        finally:
+            Path(script_path).unlink(missing_ok=True)
+
+    async def _execute_subprocess(
+        self, args: list[str], timeout: float, stdin: bytes | None = None
+    ) -> ToolResult:
+        cgroup = self._limits.create_cgroup()
+        try:
+            return await self._run_subprocess(args, timeout, stdin, cgroup)
+        finally:
+            remove_cgroup(cgroup)
 
+    async def _run_subprocess(
+        self, args: list[str], timeout: float, stdin: bytes | None, cgroup: Path | None
+    ) -> ToolResult:
+        # Limits are applied by the worker script, which then execs python3.
+        launcher = self._limits.worker_args(cgroup)
+        if launcher:
+            args = [str(WORKER_SCRIPT), *launcher, "--", *args]
+        proc = await asyncio.create_subprocess_exec(
+            "python3",
+            *args,
+            stdin=asyncio.subprocess.PIPE if stdin is not None else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=SANDBOX_ENV,
+        )
+        stdout = _OutputCapture("stdout", self._max_output_bytes, self._on_output)
+        stderr = _OutputCapture("stderr", self._max_output_bytes, self._on_output)
+        overflow_killed = False
+
+        async def feed_stdin() -> None:
+            assert proc.stdin is not None
             try:
-                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
-            except asyncio.TimeoutError:
-                proc.kill()
-                await proc.wait()
-                return ToolResult(
-                    success=False,
-                    error=f"Execution timed out after {timeout}s",
-                    metadata={"timeout": True},
-                )
-
-            stdout_str = stdout.decode("utf-8", errors="replace")[: self._max_output]
-            stderr_str = stderr.decode("utf-8", errors="replace")[: self._max_output]
+                proc.stdin.write(stdin)  # type: ignore[arg-type]
+                await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                proc.stdin.close()
+
+        async def pump(stream: asyncio.StreamReader, capture: _OutputCapture) -> None:
+            nonlocal overflow_killed
+            while chunk := await stream.read(_READ_CHUNK):
+                if capture.feed(chunk) and self._kill_on_overflow and proc.returncode is None:
+                    overflow_killed = True
+                    proc.kill()
+                await capture.emit_lines()
+            await capture.emit_lines(final=True)
 
+        async def collect() -> None:
+            tasks = [pump(proc.stdout, stdout), pump(proc.stderr, stderr)]  # type: ignore[arg-type]
+            if stdin is not None:
+                tasks.append(feed_stdin())
+            await asyncio.gather(*tasks)
+            await proc.wait()
+
+        try:
+            await asyncio.wait_for(collect(), timeout=timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
             return ToolResult(
-                success=proc.returncode == 0,
-                output={
-                    "stdout": stdout_str,
-                    "stderr": stderr_str,
-                    "returncode": proc.returncode,
-                },
-                error=stderr_str if proc.returncode != 0 else None,
+                success=False,
+                error=f"Execution timed out after {timeout}s",
+                metadata={"timeout": True},
             )
 
+        stdout_str = stdout.text(self._max_output)
+        stderr_str = stderr.text(self._max_output)
+        error = stderr_str if proc.returncode != 0 else None
+        metadata: dict[str, Any] = {
+            "truncated": stdout.truncated or stderr.truncated,
+            "output_bytes": {"stdout": stdout.total, "stderr": stderr.total},
+        }
+        if overflow_killed:
+            error = f"Output exceeded {self._max_output_bytes} bytes; process killed"
+        elif proc.returncode != 0:
+            error = self._check_limits(proc.returncode, stderr_str, metadata, cgroup) or error
+
+        return ToolResult(
+            success=proc.returncode == 0,
+            output={
+                "stdout": stdout_str,
+                "stderr": stderr_str,
+                "returncode": proc.returncode,
+            },
+            error=error,
+            metadata=metadata,
+        )
+
+    def _check_limits(
+        self,
+        returncode: int | None,
+        stderr: str,
+        metadata: dict[str, Any],
+        cgroup: Path | None = None,
+    ) -> str | None:
+        """Record a resource-limit breach in ``metadata``; returns an error message."""
+        breach = self._limits.classify_breach(returncode, stderr, cgroup)
+        if breach is None:
+            return None
+        metadata["limit_exceeded"] = breach
+        metadata["limits"] = self._limits.describe()
+        return f"Resource limit exceeded: {breach}"
+
+    async def start(self) -> None:
+        """Pre-spawn the worker pool, if one is configured."""
+        if self._pool is not None:
+            await self._pool.start()
+
+    async def aclose(self) -> None:
+        """Shut down the worker pool, if one is configured."""
+        if self._pool is not None:
+            await self._pool.close()
+
+    async def _execute_pooled(self, code: str, timeout: float) -> ToolResult:
+        try:
+            run = await self._pool.run(code, timeout)  # type: ignore[union-attr]
+        except asyncio.TimeoutError:
+            run = {"timeout": True}
+        return await self._worker_result(run, timeout)
+
+    def _make_pool(self, size: int, cgroup: Path | None = None) -> WorkerPool:
+        """Build a worker pool from this tool's settings."""
+        return WorkerPool(
+            size,
+            env=SANDBOX_ENV,
+            max_output=self._max_output,
+            max_runs_per_worker=self._max_runs_per_worker,
+            limits=self._limits,
+            cgroup=cgroup,
+        )
+
+    async def _execute_batch(self, params: dict[str, Any]) -> ToolResult:
+        """Run a list of snippets in one worker, amortising interpreter startup."""
+        default_timeout = min(params.get("timeout_seconds", self._timeout), self._timeout)
+        snippets: list[tuple[str, float]] = []
+        for item in params.get("snippets") or []:
+            if isinstance(item, str):
+                item = {"code": item}
+            code = item.get("code", "") if isinstance(item, dict) else ""
+            if not code.strip():
+                return ToolResult(success=False, error=f"Snippet {len(snippets)} has no code")
+            timeout = min(item.get("timeout_seconds", default_timeout), self._timeout)
+            snippets.append((code, timeout))
+        if not snippets:
+            return ToolResult(success=False, error="No snippets provided")
+
+        # Without a configured pool the batch is a cold start of its own, so
+        # it gets a one-off worker in its own cgroup, like a single run.
+        cgroup = None if self._pool else self._limits.create_cgroup()
+        pool = self._pool or self._make_pool(1, cgroup)
+        try:
+            runs = await pool.run_batch(snippets)
+            results = []
+            for run, (_, timeout) in zip(runs, snippets):
+                result = await self._worker_result(run, timeout, cgroup)
+                results.append({
+                    **(result.output or {}),
+                    "success": result.success,
+                    "error": result.error,
+                    **{k: v for k, v in result.metadata.items() if k != "pooled"},
+                })
         finally:
-            Path(script_path).unlink(missing_ok=True)
+            if pool is not self._pool:
+                await pool.close()
+                remove_cgroup(cgroup)
+
+        failed = [i for i, r in enumerate(results) if not r["success"]]
+        return ToolResult(
+            success=not failed,
+            output={"results": results},
+            error=f"Snippets {failed} failed" if failed else None,
+            metadata={
+                "batch_size": len(results),
+                "pooled": self._pool is not None,
+                "truncated": any(r.get("truncated") for r in results),
+            },
+        )
+
+    async def _worker_result(
+        self, run: dict[str, Any], timeout: float, cgroup: Path | None = None
+    ) -> ToolResult:
+        """Convert a sandbox worker response into a ToolResult.
+
+        The worker already capped each stream at ``max_output_chars``; the
+        byte cap, overflow policy and ``on_output`` apply here, as they do to
+        a subprocess's pipes.
+        """
+        if run.get("timeout"):
+            return ToolResult(
+                success=False,
+                error=f"Execution timed out after {timeout}s",
+                metadata={"timeout": True, "pooled": True},
+            )
+
+        captures = []
+        for name in ("stdout", "stderr"):
+            capture = _OutputCapture(name, self._max_output_bytes, self._on_output)
+            capture.feed(run[name].encode("utf-8"))
+            await capture.emit_lines(final=True)
+            captures.append(capture)
+        stdout, stderr = captures
+        stdout_str = stdout.text(self._max_output)
+        stderr_str = stderr.text(self._max_output)
+        overflow = stdout.truncated or stderr.truncated
+        returncode = run["returncode"]
+        error = stderr_str if returncode != 0 else None
+        metadata: dict[str, Any] = {"pooled": True, "truncated": run["truncated"] or overflow}
+        if overflow and self._kill_on_overflow:
+            error = f"Output exceeded {self._max_output_bytes} bytes"
+        elif returncode != 0:
+            error = self._check_limits(returncode, stderr_str, metadata, cgroup) or error
+        return ToolResult(
+            success=returncode == 0 and error is None,
+            output={
+                "stdout": stdout_str,
+                "stderr": stderr_str,
+                "returncode": returncode,
+            },
+            error=error,
+            metadata=metadata,
+        )
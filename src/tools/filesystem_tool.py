@@ -2,7 +2,21 @@
 
 from __future__ import annotations
 
+import asyncio
+import base64
+import errno
+import fnmatch
+import json
+import mmap
 import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
@@ -10,13 +24,102 @@ from agent.models import ToolResult
 
 from .base import MCPTool
 
+try:
+    import fcntl
+except ImportError:  # non-POSIX: snapshots fall back to hard links or copies
+    fcntl = None  # type: ignore[assignment]
+
+# Read parameters that switch ``read`` from whole-file to windowed mode.
+RANGE_PARAMS = ("offset", "length", "max_bytes", "start_line", "end_line", "max_lines", "cursor")
+
+# Actions allowed inside a ``batch``.
+BATCH_ACTIONS = ("read", "write", "mkdir", "delete", "list")
+
+# ioctl(2) request that clones a file's extents copy-on-write (Linux btrfs/XFS).
+FICLONE = 0x40049409
+
+_SNAPSHOT_ID = re.compile(r"\w[\w.-]*")  # never "", "." or ".."
+
+# Temp files from ``_staging_file`` (mkstemp) and ``restore``.
+_STAGING_NAME = re.compile(r"\..+\.(?:[a-z0-9_]{8}\.part|[0-9a-f]{32}\.restore)")
+
+# Files with a NUL byte in their first block are treated as binary by ``search``.
+BINARY_SNIFF_BYTES = 8192
+
 
 class FilesystemTool(MCPTool):
-    """MCP tool for sandboxed filesystem operations."""
+    """MCP tool for sandboxed filesystem operations.
+
+    All blocking disk I/O runs on a bounded thread pool of ``io_workers``
+    threads so large reads or recursive deletes never stall the event loop.
+
+    ``read`` accepts a byte window (``offset``/``length``/``max_bytes``) or a
+    line window (``start_line``/``end_line``/``max_lines``) and returns an
+    opaque ``cursor`` for the next page, so memory per call scales with the
+    window rather than the file. Files of ``mmap_threshold`` bytes or more
+    are memory-mapped. ``max_read_bytes`` caps every read, windowed or not.
+
+    ``write`` replaces files atomically (temp file + rename) so readers never
+    see a partial file, or appends with ``mode="append"``. Large artifacts
+    can be streamed: ``write_open`` returns a handle, each ``write`` with
+    that handle appends a chunk, and ``write_close`` publishes the file
+    atomically (or drops it with ``discard``).
+
+    ``walk`` (and its alias ``glob``) lists a whole subtree in one call via
+    ``os.scandir``, with depth limits, include/exclude patterns and a result
+    limit; a cursor resumes the walk where the previous page stopped.
+
+    ``search`` greps the workspace for a literal or regex with context lines,
+    scanning files in parallel on the I/O pool. Binary files are skipped and
+    the scan stops as soon as ``max_matches`` matches have been found.
+
+    ``batch`` runs a list of read/write/mkdir/delete/list ``ops`` in one call.
+    Ops on overlapping paths (the same path, or one inside the other) run in
+    list order; everything else runs concurrently.
+
+    ``snapshot`` records the workspace under ``snapshot_dir`` (which must be
+    outside the sandbox; default ``.<root>.snapshots`` beside it) by reflinking each file where the filesystem supports
+    copy-on-write, and hard-linking it otherwise, so no file data is copied.
+    ``restore`` rolls the workspace back to a snapshot, re-linking only the
+    files whose inode, size or mtime changed and deleting files created
+    since. Hard-linked snapshots rely on writes never modifying a file in
+    place: overwrites replace the inode and appends first break the link,
+    but code run by other tools that edits files in place bypasses this.
+    """
 
-    def __init__(self, sandbox_root: str = "/tmp/agent-workspace"):
+    def __init__(
+        self,
+        sandbox_root: str = "/tmp/agent-workspace",
+        io_workers: int = 4,
+        max_read_bytes: int | None = None,
+        mmap_threshold: int = 1024 * 1024,
+        snapshot_dir: str | None = None,
+    ):
         self._root = Path(sandbox_root)
         self._root.mkdir(parents=True, exist_ok=True)
+        self._io_workers = max(1, io_workers)
+        self._io_pool: ThreadPoolExecutor | None = None
+        if max_read_bytes is not None and max_read_bytes <= 0:
+            raise ValueError("max_read_bytes must be positive")
+        self._max_read_bytes = max_read_bytes
+        self._mmap_threshold = mmap_threshold
+        # handle -> (staging file, target, mode) for chunked writes
+        self._handles: dict[str, tuple[Path, Path, str]] = {}
+        self._handles_lock = threading.Lock()
+        # Default: a hidden sibling, ``.<root>.snapshots``, outside the sandbox.
+        self._snapshot_root = (
+            Path(snapshot_dir) if snapshot_dir
+            else self._root.with_name(f".{self._root.name}.snapshots")
+        ).resolve()
+        if self._snapshot_root.is_relative_to(self._root.resolve()):
+            raise ValueError("snapshot_dir must be outside the sandbox")
+        self._reflink: bool | None = None  # unknown until the first clone
+        # mkstemp creates 0o600 files; published new files get what open()
+        # would have given them. The umask is process-wide, so read it once
+        # here rather than from the I/O threads.
+        umask = os.umask(0)
+        os.umask(umask)
+        self._new_file_mode = 0o666 & ~umask
 
     @property
     def name(self) -> str:
@@ -33,10 +136,64 @@ class FilesystemTool(MCPTool):
             "properties": {
                 "action": {
                     "type": "string",
-                    "enum": ["read", "write", "list", "delete", "mkdir"],
+                    "enum": [
+                        "read",
+                        "write",
+                        "write_open",
+                        "write_close",
+                        "list",
+                        "walk",
+                        "glob",
+                        "search",
+                        "batch",
+                        "snapshot",
+                        "restore",
+                        "snapshot_drop",
+                        "delete",
+                        "mkdir",
+                    ],
                 },
                 "path": {"type": "string", "description": "Relative path within sandbox"},
                 "content": {"type": "string", "description": "Content to write (for write action)"},
+                "mode": {
+                    "type": "string",
+                    "enum": ["overwrite", "append"],
+                    "description": "write/write_open: replace atomically or append",
+                },
+                "handle": {"type": "string", "description": "Chunked-write handle"},
+                "discard": {"type": "boolean", "description": "write_close: drop the data"},
+                "pattern": {"type": "string", "description": "glob: pattern to match"},
+                "include": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "walk: glob patterns an entry must match",
+                },
+                "exclude": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "walk: glob patterns to skip (excluded dirs are not entered)",
+                },
+                "max_depth": {"type": "integer", "description": "walk: 1 = direct children only"},
+                "type": {"type": "string", "enum": ["file", "dir"]},
+                "limit": {"type": "integer", "description": "walk: max entries per page"},
+                "ops": {
+                    "type": "array",
+                    "items": {"type": "object"},
+                    "description": "batch: [{action, path, content}], paths relative to path",
+                },
+                "snapshot": {"type": "string", "description": "Snapshot id"},
+                "query": {"type": "string", "description": "search: text or regex to find"},
+                "regex": {"type": "boolean", "description": "search: treat query as a regex"},
+                "ignore_case": {"type": "boolean"},
+                "context": {"type": "integer", "description": "search: lines around each match"},
+                "max_matches": {"type": "integer", "description": "search: stop after N matches"},
+                "offset": {"type": "integer", "description": "Byte offset to start reading at"},
+                "length": {"type": "integer", "description": "Number of bytes to read"},
+                "max_bytes": {"type": "integer", "description": "Cap on bytes returned"},
+                "start_line": {"type": "integer", "description": "First line to read (1-based)"},
+                "end_line": {"type": "integer", "description": "Last line to read (inclusive)"},
+                "max_lines": {"type": "integer", "description": "Number of lines to read"},
+                "cursor": {"type": "string", "description": "Cursor from a read or walk"},
             },
             "required": ["action", "path"],
         }
@@ -45,55 +202,589 @@ class FilesystemTool(MCPTool):
         action = params.get("action", "")
         rel_path = params.get("path", "")
 
-        # Sandbox enforcement — resolve and check prefix
+        # Sandbox enforcement — resolve and check containment (not a string
+        # prefix: "<root>.snapshots" starts with "<root>" but is outside it)
         target = (self._root / rel_path).resolve()
-        if not str(target).startswith(str(self._root.resolve())):
+        if not target.is_relative_to(self._root.resolve()):
             return ToolResult(success=False, error="Path escapes sandbox")
+        if target.is_relative_to(self._snapshot_root):
+            return ToolResult(success=False, error="Path is inside the snapshot store")
 
         try:
             if action == "read":
-                return self._read(target)
+                return await self._run_io(self._read, target, params)
             elif action == "write":
-                return self._write(target, params.get("content", ""))
+                return await self._run_io(self._write, target, params)
+            elif action == "write_open":
+                return await self._run_io(self._write_open, target, params.get("mode", "overwrite"))
+            elif action == "write_close":
+                return await self._run_io(self._write_close, target, params)
             elif action == "list":
-                return self._list(target)
+                return await self._run_io(self._list, target)
+            elif action in ("walk", "glob"):
+                if action == "glob":
+                    params = {**params, "include": [params.get("pattern", "*")]}
+                return await self._run_io(self._walk, target, params)
+            elif action == "search":
+                return await self._search(target, params)
+            elif action == "batch":
+                return await self._batch(rel_path, params.get("ops") or [])
+            elif action == "snapshot":
+                return await self._run_io(self._snapshot, params.get("snapshot"))
+            elif action == "restore":
+                return await self._run_io(self._restore, params.get("snapshot", ""))
+            elif action == "snapshot_drop":
+                return await self._run_io(self._snapshot_drop, params.get("snapshot", ""))
             elif action == "delete":
-                return self._delete(target)
+                return await self._run_io(self._delete, target)
             elif action == "mkdir":
-                return self._mkdir(target)
+                return await self._run_io(self._mkdir, target)
             else:
                 return ToolResult(success=False, error=f"Unknown action: {action}")
         except Exception as e:
             return ToolResult(success=False, error=str(e))
 
-    def _read(self, path: Path) -> ToolResult:
+    async def aclose(self) -> None:
+        """Drop unfinished chunked writes and shut down the I/O thread pool."""
+        with self._handles_lock:
+            handles, self._handles = self._handles, {}
+        for staging, _, mode in handles.values():
+            if mode == "overwrite":
+                staging.unlink(missing_ok=True)
+        if self._io_pool is not None:
+            pool, self._io_pool = self._io_pool, None
+            await asyncio.to_thread(pool.shutdown)
+
+    async def _run_io(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking filesystem call on the I/O thread pool."""
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(
+                max_workers=self._io_workers, thread_name_prefix="fs-io"
+            )
+        return await asyncio.get_running_loop().run_in_executor(self._io_pool, fn, *args)
+
+    def _read(self, path: Path, params: dict[str, Any] | None = None) -> ToolResult:
         if not path.exists():
             return ToolResult(success=False, error=f"File not found: {path.name}")
-        content = path.read_text(encoding="utf-8")
-        return ToolResult(success=True, output={"content": content, "size": len(content)})
+        params = params or {}
+        if self._max_read_bytes is None and not any(k in params for k in RANGE_PARAMS):
+            content = path.read_text(encoding="utf-8")
+            return ToolResult(success=True, output={"content": content, "size": len(content)})
+        return self._read_window(path, params)
+
+    def _read_window(self, path: Path, params: dict[str, Any]) -> ToolResult:
+        """Read one byte or line window of ``path`` and issue a continuation cursor."""
+        rel = path.relative_to(self._root.resolve()).as_posix()
+        state: dict[str, Any] = {}
+        if params.get("cursor"):
+            try:
+                state = json.loads(base64.urlsafe_b64decode(params["cursor"].encode()))
+            except ValueError:
+                return ToolResult(success=False, error="Invalid cursor")
+            if state.get("path") != rel:
+                return ToolResult(success=False, error="Cursor belongs to a different file")
+
+        for name in ("length", "max_bytes", "max_lines"):
+            value = params.get(name)
+            if value is not None and (not isinstance(value, int) or value <= 0):
+                return ToolResult(success=False, error=f"{name} must be a positive integer")
+        if params.get("offset") is not None and (
+            not isinstance(params["offset"], int) or params["offset"] < 0
+        ):
+            return ToolResult(success=False, error="offset must be a non-negative integer")
+
+        caps = [params.get("max_bytes"), self._max_read_bytes]
+        max_bytes = min((c for c in caps if c is not None), default=None)
+        line_mode = state.get("line") is not None or any(
+            k in params for k in ("start_line", "end_line", "max_lines")
+        )
+        offset = state.get("offset", params.get("offset", 0))
+        line = state.get("line", params.get("start_line", 1)) if line_mode else None
+
+        file_size = path.stat().st_size
+        if offset < 0 or offset > file_size:
+            return ToolResult(
+                success=False, error=f"Offset {offset} outside file ({file_size} bytes)"
+            )
+
+        with open(path, "rb") as f:
+            source: Any = f
+            mapped = None
+            if file_size and file_size >= self._mmap_threshold:
+                mapped = source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                if line_mode:
+                    data, offset, next_offset, next_line = self._take_lines(
+                        source, offset, line, params, max_bytes, from_cursor=bool(state)
+                    )
+                else:
+                    limit = min(
+                        (c for c in (params.get("length"), max_bytes) if c is not None),
+                        default=file_size - offset,
+                    )
+                    source.seek(offset)
+                    data = source.read(limit)
+                    next_offset, next_line = offset + len(data), None
+
+                if next_offset < file_size and data:
+                    trimmed = _trim_partial_utf8(data)
+                    if not trimmed:
+                        # The window holds part of a single character: return
+                        # that whole character so paging always moves forward.
+                        source.seek(offset)
+                        trimmed = source.read(_utf8_width(data[0]))
+                    data = trimmed
+                    next_offset = offset + len(data)
+            finally:
+                if mapped is not None:
+                    mapped.close()
 
-    def _write(self, path: Path, content: str) -> ToolResult:
+        eof = next_offset >= file_size
+        content = data.decode("utf-8", errors="replace")
+        output: dict[str, Any] = {
+            "content": content,
+            "size": len(content),
+            "offset": offset,
+            "next_offset": next_offset,
+            "file_size": file_size,
+            "eof": eof,
+            "cursor": None if eof else _encode_cursor(rel, next_offset, next_line),
+        }
+        if line_mode:
+            lines = content.count("\n") + (1 if content and not content.endswith("\n") else 0)
+            output["start_line"] = line
+            output["end_line"] = line + lines - 1
+        return ToolResult(success=True, output=output)
+
+    def _take_lines(
+        self,
+        source: Any,
+        offset: int,
+        line: int,
+        params: dict[str, Any],
+        max_bytes: int | None,
+        from_cursor: bool,
+    ) -> tuple[bytes, int, int, int]:
+        """Collect a window of whole lines; works on a file object or an mmap."""
+        if from_cursor:
+            source.seek(offset)
+        else:
+            # Skip to start_line without materialising the skipped lines.
+            source.seek(0)
+            for _ in range(max(line, 1) - 1):
+                if not source.readline():
+                    break
+            offset = source.tell()
+
+        max_lines = params.get("max_lines")
+        if params.get("end_line") is not None:
+            span = params["end_line"] - line + 1
+            max_lines = span if max_lines is None else min(max_lines, span)
+
+        chunks: list[bytes] = []
+        taken = 0
+        count = 0
+        while max_lines is None or count < max_lines:
+            room = None if max_bytes is None else max_bytes - taken
+            if room is not None and room <= 0:
+                break
+            chunk = _readline(source, room)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            taken += len(chunk)
+            if chunk.endswith(b"\n"):
+                count += 1
+        data = b"".join(chunks)
+        return data, offset, offset + len(data), line + count
+
+    def _write(self, path: Path, params: dict[str, Any]) -> ToolResult:
+        content = params.get("content", "")
+        if params.get("handle"):
+            return self._write_chunk(path, params["handle"], content)
+
+        mode = params.get("mode", "overwrite")
         path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(content, encoding="utf-8")
+        if mode == "append":
+            self._break_link(path)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(content)
+        elif mode == "overwrite":
+            staging = self._staging_file(path)
+            try:
+                staging.write_text(content, encoding="utf-8")
+                self._publish(staging, path)
+            except BaseException:
+                staging.unlink(missing_ok=True)
+                raise
+        else:
+            return ToolResult(success=False, error=f"Unknown write mode: {mode}")
         return ToolResult(success=True, output={"path": str(path.name), "size": len(content)})
 
+    def _write_open(self, path: Path, mode: str) -> ToolResult:
+        if mode not in ("overwrite", "append"):
+            return ToolResult(success=False, error=f"Unknown write mode: {mode}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if mode == "append":
+            # Appends go straight to the target; nothing to publish on close.
+            self._break_link(path)
+            path.touch()
+            staging = path
+        else:
+            staging = self._staging_file(path)
+        handle = uuid.uuid4().hex
+        with self._handles_lock:
+            self._handles[handle] = (staging, path, mode)
+        return ToolResult(success=True, output={"handle": handle, "path": path.name, "mode": mode})
+
+    def _write_chunk(self, path: Path, handle: str, content: str) -> ToolResult:
+        with self._handles_lock:
+            entry = self._handles.get(handle)
+        if entry is None or entry[1] != path:
+            return ToolResult(success=False, error=f"Unknown write handle for {path.name}")
+        staging, _, mode = entry
+        if mode == "append":
+            # A snapshot taken since the handle was opened may share this inode.
+            self._break_link(staging)
+        with open(staging, "a", encoding="utf-8") as f:
+            f.write(content)
+        return ToolResult(
+            success=True,
+            output={"path": path.name, "handle": handle, "size": staging.stat().st_size},
+        )
+
+    def _write_close(self, path: Path, params: dict[str, Any]) -> ToolResult:
+        handle = params.get("handle", "")
+        with self._handles_lock:
+            entry = self._handles.get(handle)
+            if entry is None or entry[1] != path:
+                return ToolResult(success=False, error=f"Unknown write handle for {path.name}")
+            del self._handles[handle]
+        staging, _, mode = entry
+
+        if params.get("discard"):
+            if mode == "overwrite":
+                staging.unlink(missing_ok=True)
+            return ToolResult(success=True, output={"path": path.name, "discarded": True})
+        if mode == "overwrite":
+            self._publish(staging, path)
+        return ToolResult(success=True, output={"path": path.name, "size": path.stat().st_size})
+
+    def _staging_file(self, path: Path) -> Path:
+        """Create an empty hidden temp file next to ``path`` (same filesystem)."""
+        fd, name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".part")
+        os.close(fd)
+        return Path(name)
+
+    def _publish(self, staging: Path, path: Path) -> None:
+        """Atomically move a fully written staging file into place."""
+        try:
+            mode = path.stat().st_mode & 0o777
+        except FileNotFoundError:
+            mode = self._new_file_mode
+        os.chmod(staging, mode)
+        os.replace(staging, path)
+
+    def _break_link(self, path: Path) -> None:
+        """Give ``path`` its own inode so in-place writes can't reach a snapshot."""
+        try:
+            if path.stat().st_nlink < 2:
+                return
+        except FileNotFoundError:
+            return
+        staging = self._staging_file(path)
+        try:
+            shutil.copy2(path, staging)
+            os.replace(staging, path)
+        except BaseException:
+            staging.unlink(missing_ok=True)
+            raise
+
     def _list(self, path: Path) -> ToolResult:
         if not path.exists():
             return ToolResult(success=False, error=f"Directory not found: {path.name}")
         entries = []
-        for entry in sorted(path.iterdir()):
+        with os.scandir(path) as it:
+            for entry in sorted(it, key=lambda e: e.name):
+                if _is_staging(entry.name):
+                    continue
+                entries.append({
+                    "name": entry.name,
+                    "type": "dir" if entry.is_dir() else "file",
+                    "size": entry.stat().st_size if entry.is_file() else 0,
+                })
+        return ToolResult(success=True, output=entries)
+
+    def _walk(self, path: Path, params: dict[str, Any]) -> ToolResult:
+        """List a subtree in sorted depth-first order, one page at a time."""
+        if not path.is_dir():
+            return ToolResult(success=False, error=f"Directory not found: {path.name}")
+        include = _patterns(params.get("include"))
+        kind = params.get("type")
+        limit = max(1, params.get("limit", 1000))
+        after: tuple[str, ...] = ()
+        if params.get("cursor"):
+            try:
+                after = tuple(json.loads(base64.urlsafe_b64decode(params["cursor"].encode())))
+            except ValueError:
+                return ToolResult(success=False, error="Invalid cursor")
+
+        entries: list[dict[str, Any]] = []
+        more = False
+        tree = _iter_tree(
+            str(path), (), after, params.get("max_depth"), _patterns(params.get("exclude"))
+        )
+        for parts, entry, is_dir in tree:
+            if include and not _matches("/".join(parts), entry.name, include):
+                continue
+            if kind and kind != ("dir" if is_dir else "file"):
+                continue
+            if len(entries) == limit:
+                more = True
+                break
+            # DirEntry caches stat data, so this is free for most entries.
+            stat = entry.stat(follow_symlinks=False)
             entries.append({
-                "name": entry.name,
-                "type": "dir" if entry.is_dir() else "file",
-                "size": entry.stat().st_size if entry.is_file() else 0,
+                "path": "/".join(parts),
+                "type": "dir" if is_dir else "file",
+                "size": 0 if is_dir else stat.st_size,
+                "mtime": stat.st_mtime,
             })
-        return ToolResult(success=True, output=entries)
+
+        cursor = None
+        if more:
+            last = entries[-1]["path"].split("/")
+            cursor = base64.urlsafe_b64encode(json.dumps(last).encode()).decode()
+        return ToolResult(success=True, output={"entries": entries, "cursor": cursor})
+
+    async def _search(self, path: Path, params: dict[str, Any]) -> ToolResult:
+        """Find ``query`` in the files under ``path``, one pool task per file.
+
+        Files are scanned concurrently, so when the match budget runs out the
+        matches kept are whichever files got there first; results are still
+        returned sorted by path and line.
+        """
+        query = params.get("query")
+        if not query:
+            return ToolResult(success=False, error="search requires a query")
+        flags = re.IGNORECASE if params.get("ignore_case") else 0
+        try:
+            pattern = re.compile(query if params.get("regex") else re.escape(query), flags)
+        except re.error as e:
+            return ToolResult(success=False, error=f"Invalid pattern: {e}")
+        # A case-sensitive literal can reject whole files with one bytes scan.
+        needle = None if params.get("regex") or flags else query.encode()
+
+        files = await self._run_io(self._search_files, path, params)
+        if files is None:
+            return ToolResult(success=False, error=f"Path not found: {path.name}")
+
+        budget = _MatchBudget(max(1, params.get("max_matches", 100)))
+        context = max(0, params.get("context", 0))
+        scans = await asyncio.gather(*(
+            self._run_io(_search_file, file, rel, pattern, needle, context, budget)
+            for file, rel in files
+        ))
+        matches = sorted(
+            (m for found in scans if isinstance(found, list) for m in found),
+            key=lambda m: (m["path"], m["line"]),
+        )
+        return ToolResult(success=True, output={
+            "matches": matches,
+            "files_scanned": sum(isinstance(found, list) for found in scans),
+            "binary_skipped": sum(found is _BINARY for found in scans),
+            "truncated": budget.exhausted,
+        })
+
+    async def _batch(self, base: str, ops: list[dict[str, Any]]) -> ToolResult:
+        """Run ``ops`` concurrently, ordering only ops whose paths overlap."""
+        if not isinstance(ops, list) or not all(isinstance(op, dict) for op in ops):
+            return ToolResult(success=False, error="batch ops must be a list of objects")
+        for op in ops:
+            if op.get("action") not in BATCH_ACTIONS:
+                return ToolResult(
+                    success=False, error=f"Unsupported batch action: {op.get('action')}"
+                )
+        ops = [
+            {**op, "path": os.path.normpath(os.path.join(base, op.get("path", "")))}
+            for op in ops
+        ]
+        targets = [(self._root / op["path"]).resolve() for op in ops]
+
+        def overlaps(a: Path, b: Path) -> bool:
+            return a == b or a in b.parents or b in a.parents
+
+        tasks: list[asyncio.Task[ToolResult]] = []
+        for i, op in enumerate(ops):
+            before = [
+                tasks[j] for j in range(i)
+                if overlaps(targets[i], targets[j])
+                and not (op["action"] in ("read", "list") and ops[j]["action"] in ("read", "list"))
+            ]
+            tasks.append(asyncio.ensure_future(self._after(before, op)))
+        results = await asyncio.gather(*tasks)
+
+        failed = sum(not r.success for r in results)
+        return ToolResult(
+            success=not failed,
+            output={"results": [
+                {"action": op["action"], "path": op["path"], **r.model_dump(
+                    include={"success", "output", "error"}
+                )}
+                for op, r in zip(ops, results)
+            ]},
+            error=f"{failed} of {len(ops)} batch ops failed" if failed else None,
+        )
+
+    async def _after(
+        self, before: list[asyncio.Task[ToolResult]], op: dict[str, Any]
+    ) -> ToolResult:
+        if before:
+            await asyncio.wait(before)
+        return await self.execute(op)
+
+    def _search_files(
+        self, path: Path, params: dict[str, Any]
+    ) -> list[tuple[Path, str]] | None:
+        """List the files to scan, or ``None`` if ``path`` does not exist."""
+        if path.is_file():
+            return [(path, path.name)]
+        if not path.is_dir():
+            return None
+        include = _patterns(params.get("include"))
+        tree = _iter_tree(
+            str(path), (), (), params.get("max_depth"), _patterns(params.get("exclude"))
+        )
+        return [
+            (Path(entry.path), "/".join(parts))
+            for parts, entry, is_dir in tree
+            if not is_dir
+            and entry.is_file(follow_symlinks=False)
+            and (not include or _matches("/".join(parts), entry.name, include))
+        ]
+
+    def _snapshot(self, snapshot_id: str | None) -> ToolResult:
+        snapshot_id = snapshot_id or uuid.uuid4().hex[:12]
+        target = self._snapshot_path(snapshot_id)
+        if target is None:
+            return ToolResult(success=False, error=f"Invalid snapshot id: {snapshot_id}")
+        if target.exists():
+            return ToolResult(success=False, error=f"Snapshot already exists: {snapshot_id}")
+        files_dir = target / "files"
+        files_dir.mkdir(parents=True)
+
+        files: dict[str, list[int]] = {}
+        dirs: list[str] = []
+        methods: dict[str, int] = {}
+        for parts, entry, is_dir in _iter_tree(str(self._root), (), (), None, []):
+            rel = "/".join(parts)
+            if is_dir:
+                dirs.append(rel)
+                (files_dir / rel).mkdir()
+                continue
+            method = self._clone(entry.path, files_dir / rel)
+            methods[method] = methods.get(method, 0) + 1
+            files[rel] = _file_key(os.lstat(entry.path))
+        _write_manifest(target, files, dirs)
+        return ToolResult(
+            success=True,
+            output={"snapshot": snapshot_id, "files": len(files), "methods": methods},
+        )
+
+    def _restore(self, snapshot_id: str) -> ToolResult:
+        target = self._snapshot_path(snapshot_id)
+        if target is None or not target.is_dir():
+            return ToolResult(success=False, error=f"Snapshot not found: {snapshot_id}")
+        manifest = json.loads((target / "manifest.json").read_text())
+        files: dict[str, list[int]] = manifest["files"]
+        dirs = set(manifest["dirs"])
+
+        # Only metadata is read for unchanged files; data moves for changes only.
+        unchanged: set[str] = set()
+        removed = 0
+        stray_dirs: list[Path] = []
+        for parts, entry, is_dir in list(_iter_tree(str(self._root), (), (), None, [])):
+            rel = "/".join(parts)
+            if is_dir:
+                if rel not in dirs:
+                    stray_dirs.append(Path(entry.path))
+            elif files.get(rel) == _file_key(entry.stat(follow_symlinks=False)):
+                unchanged.add(rel)
+            elif rel not in files:
+                os.unlink(entry.path)
+                removed += 1
+        for stray in stray_dirs:
+            if stray.exists():
+                shutil.rmtree(stray)
+        for rel in sorted(dirs):
+            (self._root / rel).mkdir(exist_ok=True)
+
+        restored = [rel for rel in files if rel not in unchanged]
+        for rel in restored:
+            path = self._root / rel
+            staging = path.with_name(f".{path.name}.{uuid.uuid4().hex}.restore")
+            try:
+                self._clone(str(target / "files" / rel), staging)
+                if path.is_dir() and not path.is_symlink():
+                    shutil.rmtree(path)
+                os.replace(staging, path)
+            except BaseException:
+                staging.unlink(missing_ok=True)
+                raise
+            files[rel] = _file_key(os.lstat(path))
+        if restored:
+            _write_manifest(target, files, sorted(dirs))
+        return ToolResult(success=True, output={
+            "snapshot": snapshot_id,
+            "restored": len(restored),
+            "removed": removed,
+            "unchanged": len(unchanged),
+        })
+
+    def _snapshot_drop(self, snapshot_id: str) -> ToolResult:
+        target = self._snapshot_path(snapshot_id)
+        if target is None or not target.is_dir():
+            return ToolResult(success=False, error=f"Snapshot not found: {snapshot_id}")
+        shutil.rmtree(target)
+        return ToolResult(success=True, output={"dropped": snapshot_id})
+
+    def _snapshot_path(self, snapshot_id: Any) -> Path | None:
+        """The directory of ``snapshot_id``; None unless directly inside the store."""
+        if not isinstance(snapshot_id, str) or not _SNAPSHOT_ID.fullmatch(snapshot_id):
+            return None
+        target = self._snapshot_root / snapshot_id
+        if target.resolve().parent != self._snapshot_root:
+            return None
+        return target
+
+    def _clone(self, src: str, dst: Path) -> str:
+        """Copy ``src`` to ``dst`` as cheaply as the filesystem allows."""
+        if os.path.islink(src):
+            os.symlink(os.readlink(src), dst)
+            return "symlink"
+        if self._reflink is not False and fcntl is not None:
+            try:
+                with open(src, "rb") as s, open(dst, "wb") as d:
+                    fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+                shutil.copystat(src, dst)
+                self._reflink = True
+                return "reflink"
+            except OSError as e:
+                dst.unlink(missing_ok=True)
+                if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL):
+                    raise
+                self._reflink = False
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            shutil.copy2(src, dst)
+            return "copy"
 
     def _delete(self, path: Path) -> ToolResult:
         if not path.exists():
             return ToolResult(success=False, error=f"Not found: {path.name}")
         if path.is_dir():
-            import shutil
             shutil.rmtree(path)
         else:
             path.unlink()
@@ -102,3 +793,183 @@ class FilesystemTool(MCPTool):
     def _mkdir(self, path: Path) -> ToolResult:
         path.mkdir(parents=True, exist_ok=True)
         return ToolResult(success=True, output={"created": str(path.name)})
+
+
+def _iter_tree(
+    directory: str,
+    prefix: tuple[str, ...],
+    after: tuple[str, ...],
+    max_depth: int | None,
+    exclude: list[str],
+) -> Iterator[tuple[tuple[str, ...], os.DirEntry[str], bool]]:
+    """Yield ``(parts, entry, is_dir)`` in sorted pre-order below ``directory``.
+
+    Sorted pre-order visits paths in lexicographic order of their components,
+    so resuming ``after`` a path prunes every subtree that precedes it
+    instead of re-walking it. Excluded directories are not entered, and
+    staging files of in-flight writes are not workspace content, so they
+    are never yielded.
+    """
+    try:
+        with os.scandir(directory) as it:
+            children = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return
+    for entry in children:
+        if _is_staging(entry.name):
+            continue
+        parts = prefix + (entry.name,)
+        if exclude and _matches("/".join(parts), entry.name, exclude):
+            continue
+        is_dir = entry.is_dir(follow_symlinks=False)
+        if parts > after:
+            yield parts, entry, is_dir
+        if (
+            is_dir
+            and (max_depth is None or len(parts) < max_depth)
+            and (parts > after or after[: len(parts)] == parts)
+        ):
+            yield from _iter_tree(entry.path, parts, after, max_depth, exclude)
+
+
+# Sentinels returned by ``_search_file`` for files it did not scan for text.
+_BINARY = object()
+_SKIPPED = object()
+
+
+class _MatchBudget:
+    """Match quota shared by the per-file scans of one ``search``.
+
+    ``exhausted`` is set once a scan finds a match after the quota ran out,
+    i.e. only when the results really are incomplete.
+    """
+
+    def __init__(self, limit: int):
+        self._remaining = limit
+        self._lock = threading.Lock()
+        self.exhausted = False
+
+    def take(self) -> bool:
+        with self._lock:
+            if self._remaining == 0:
+                self.exhausted = True
+                return False
+            self._remaining -= 1
+            return True
+
+
+def _search_file(
+    path: Path,
+    rel: str,
+    pattern: re.Pattern[str],
+    needle: bytes | None,
+    context: int,
+    budget: _MatchBudget,
+) -> list[dict[str, Any]] | object:
+    """Return the matches in one file, ``_BINARY`` or ``_SKIPPED``.
+
+    Once the quota is spent a scan keeps going only until it finds one more
+    match, which proves the results are truncated; files not yet opened by
+    then are skipped.
+    """
+    if budget.exhausted:
+        return _SKIPPED
+    matches: list[dict[str, Any]] = []
+    with open(path, "rb") as f:
+        if b"\0" in f.read(BINARY_SNIFF_BYTES):
+            return _BINARY
+        f.seek(0)
+        if needle is not None:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return matches
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if mapped.find(needle) == -1:
+                    return matches
+        before: deque[str] = deque(maxlen=context)
+        pending: list[dict[str, Any]] = []  # matches still collecting after-context
+        for number, raw in enumerate(f, start=1):
+            line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+            for match in pending:
+                match["after"].append(line)
+            pending = [m for m in pending if len(m["after"]) < context]
+            if pattern.search(line) and budget.take():
+                match = {"path": rel, "line": number, "text": line,
+                         "before": list(before), "after": []}
+                matches.append(match)
+                if context:
+                    pending.append(match)
+            elif budget.exhausted and not pending:
+                break
+            before.append(line)
+    return matches
+
+
+def _is_staging(name: str) -> bool:
+    return _STAGING_NAME.fullmatch(name) is not None
+
+
+def _file_key(stat: os.stat_result) -> list[int]:
+    """What ``restore`` compares to decide whether a file changed."""
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def _write_manifest(target: Path, files: dict[str, list[int]], dirs: list[str]) -> None:
+    staging = target / "manifest.json.part"
+    staging.write_text(json.dumps({"files": files, "dirs": dirs}))
+    os.replace(staging, target / "manifest.json")
+
+
+def _patterns(value: Any) -> list[str]:
+    if not value:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _matches(rel: str, name: str, patterns: list[str]) -> bool:
+    return any(fnmatch.fnmatchcase(rel, p) or fnmatch.fnmatchcase(name, p) for p in patterns)
+
+
+def _readline(source: Any, limit: int | None) -> bytes:
+    """``readline(limit)`` for files and mmaps (whose readline takes no limit)."""
+    if limit is None:
+        return source.readline()
+    if isinstance(source, mmap.mmap):
+        start = source.tell()
+        end = source.find(b"\n", start, start + limit)
+        return source.read(end - start + 1 if end >= 0 else limit)
+    return source.readline(limit)
+
+
+def _encode_cursor(path: str, offset: int, line: int | None) -> str:
+    state = {"path": path, "offset": offset, "line": line}
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+
+def _utf8_width(lead: int) -> int:
+    """Byte length of the UTF-8 sequence starting with ``lead`` (1 if invalid)."""
+    if lead >= 0xF0:
+        return 4
+    if lead >= 0xE0:
+        return 3
+    if lead >= 0xC0:
+        return 2
+    return 1
+
+
+def _trim_partial_utf8(data: bytes) -> bytes:
+    """Drop a multi-byte UTF-8 sequence cut off at the end of a window."""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 == 0x80:
+            continue  # continuation byte
+        if byte < 0x80:
+            needed = 1
+        elif byte >= 0xF0:
+            needed = 4
+        elif byte >= 0xE0:
+            needed = 3
+        else:
+            needed = 2
+        return data if back >= needed else data[:-back]
+    return data
@@ -2,6 +2,9 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import importlib.util
 import os
 from typing import Any
 
@@ -10,14 +13,53 @@ import httpx
 from agent.models import ToolResult
 
 from .base import MCPTool
+from .cache import ResponseCache
+from .http_client import PooledClientMixin
+from .rate_limit import RateLimiter, RateLimitExceeded
 
 
-class GitHubTool(MCPTool):
+class GitHubTool(PooledClientMixin, MCPTool):
     """MCP tool for GitHub operations: create repos, files, issues, read files."""
 
-    def __init__(self, token: str | None = None):
+    def __init__(
+        self,
+        token: str | None = None,
+        client: httpx.AsyncClient | None = None,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        timeout: float = 30,
+        cache_dir: str | None = None,
+        cache_entries: int = 256,
+        rate_limiter: RateLimiter | None = None,
+        rate_limit_retries: int = 2,
+        blob_concurrency: int = 8,
+    ):
         self._token = token or os.environ.get("GITHUB_TOKEN", "")
         self._base = "https://api.github.com"
+        self._headers = {
+            "Authorization": f"token {self._token}",
+            "Accept": "application/vnd.github.v3+json",
+        }
+        # One long-lived pooled client, created lazily on first use so the
+        # connection pool binds to the running event loop.
+        self._init_client(client)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # HTTP/2 needs the optional ``h2`` package (``httpx[http2]``).
+        self._http2 = http2 and importlib.util.find_spec("h2") is not None
+        self._timeout = timeout
+        # Conditional-request cache for read endpoints. Keys are namespaced by
+        # token so a shared cache_dir never serves one account's data to another.
+        self._cache = ResponseCache(cache_dir, cache_entries) if cache_entries > 0 else None
+        self._cache_ns = hashlib.sha256(self._token.encode()).hexdigest()[:16]
+        self._limiter = rate_limiter or RateLimiter(max_concurrent=max_connections)
+        self._rate_limit_retries = rate_limit_retries
+        self._blob_concurrency = max(1, blob_concurrency)
 
     @property
     def name(self) -> str:
@@ -34,7 +76,14 @@ class GitHubTool(MCPTool):
             "properties": {
                 "action": {
                     "type": "string",
-                    "enum": ["create_repo", "read_file", "create_file", "create_issue", "list_repos"],
+                    "enum": [
+                        "create_repo",
+                        "read_file",
+                        "create_file",
+                        "commit_files",
+                        "create_issue",
+                        "list_repos",
+                    ],
                 },
                 "owner": {"type": "string"},
                 "repo": {"type": "string"},
@@ -43,36 +92,121 @@ class GitHubTool(MCPTool):
                 "title": {"type": "string"},
                 "body": {"type": "string"},
                 "private": {"type": "boolean", "default": False},
+                "files": {
+                    "type": "array",
+                    "description": "Files for commit_files",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "path": {"type": "string"},
+                            "content": {"type": "string"},
+                        },
+                        "required": ["path", "content"],
+                    },
+                },
+                "branch": {"type": "string", "description": "Defaults to the default branch"},
+                "message": {"type": "string", "description": "Commit message"},
             },
             "required": ["action"],
         }
 
     async def execute(self, params: dict[str, Any]) -> ToolResult:
         action = params.get("action", "")
-        headers = {
-            "Authorization": f"token {self._token}",
-            "Accept": "application/vnd.github.v3+json",
-        }
+        result = await self._dispatch(action, params)
+        result.metadata["rate_limit"] = self._limiter.status()
+        return result
+
+    def rate_limit_status(self) -> dict[str, Any]:
+        """Current GitHub budget as tracked from response headers."""
+        return self._limiter.status()
+
+    async def _dispatch(self, action: str, params: dict[str, Any]) -> ToolResult:
+        try:
+            if action == "create_repo":
+                return await self._create_repo(params)
+            elif action == "read_file":
+                return await self._read_file(params)
+            elif action == "create_file":
+                return await self._create_file(params)
+            elif action == "commit_files":
+                return await self._commit_files(params)
+            elif action == "create_issue":
+                return await self._create_issue(params)
+            elif action == "list_repos":
+                return await self._list_repos(params)
+            else:
+                return ToolResult(success=False, error=f"Unknown action: {action}")
+        except RateLimitExceeded as e:
+            return ToolResult(success=False, error=str(e))
+        except httpx.HTTPError as e:
+            return ToolResult(success=False, error=f"HTTP error: {e}")
+
+    def _new_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(timeout=self._timeout, limits=self._limits, http2=self._http2)
 
-        async with httpx.AsyncClient(headers=headers, timeout=30) as client:
-            try:
-                if action == "create_repo":
-                    return await self._create_repo(client, params)
-                elif action == "read_file":
-                    return await self._read_file(client, params)
-                elif action == "create_file":
-                    return await self._create_file(client, params)
-                elif action == "create_issue":
-                    return await self._create_issue(client, params)
-                elif action == "list_repos":
-                    return await self._list_repos(client, params)
-                else:
-                    return ToolResult(success=False, error=f"Unknown action: {action}")
-            except httpx.HTTPError as e:
-                return ToolResult(success=False, error=f"HTTP error: {e}")
-
-    async def _create_repo(self, client: httpx.AsyncClient, params: dict) -> ToolResult:
-        resp = await client.post(
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request over the shared client, paced by the rate limiter.
+
+        Primary and secondary rate-limit rejections are retried once the
+        limiter's advertised block has passed, up to ``rate_limit_retries``.
+        """
+        headers = {**self._headers, **kwargs.pop("headers", {})}
+        for attempt in range(self._rate_limit_retries + 1):
+            async with self._limiter.slot():
+                resp = await self._get_client().request(method, url, headers=headers, **kwargs)
+            if not self._limiter.update(resp) or attempt == self._rate_limit_retries:
+                return resp
+        return resp
+
+    async def _conditional_get(
+        self, url: str, params: dict[str, Any] | None = None
+    ) -> tuple[httpx.Response, str]:
+        """GET with If-None-Match / If-Modified-Since against the response cache.
+
+        Returns the response and ``"hit"`` when a ``304`` was served from the
+        cache (GitHub does not charge those against the rate limit), otherwise
+        ``"miss"``.
+        """
+        if self._cache is None:
+            return await self._request("GET", url, params=params), "miss"
+
+        key = f"{self._cache_ns} {httpx.URL(url, params=params)}"
+        entry = await self._cache.get(key)
+        headers: dict[str, str] = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        resp = await self._request("GET", url, params=params, headers=headers)
+
+        if resp.status_code == 304 and entry:
+            cached = httpx.Response(
+                200,
+                content=entry["content"].encode("utf-8"),
+                headers={"Content-Type": entry.get("content_type", "application/json")},
+                request=resp.request,
+            )
+            return cached, "hit"
+
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if resp.status_code == 200 and (etag or last_modified):
+            await self._cache.put(
+                key,
+                {
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "content_type": resp.headers.get("Content-Type", "application/json"),
+                    "content": resp.text,
+                },
+            )
+        return resp, "miss"
+
+    async def _create_repo(self, params: dict) -> ToolResult:
+        resp = await self._request(
+            "POST",
             f"{self._base}/user/repos",
             json={
                 "name": params.get("repo", ""),
@@ -85,25 +219,32 @@ class GitHubTool(MCPTool):
             return ToolResult(success=True, output={"url": data["html_url"], "full_name": data["full_name"]})
         return ToolResult(success=False, error=f"Status {resp.status_code}: {resp.text[:200]}")
 
-    async def _read_file(self, client: httpx.AsyncClient, params: dict) -> ToolResult:
+    async def _read_file(self, params: dict) -> ToolResult:
         owner = params.get("owner", "")
         repo = params.get("repo", "")
         path = params.get("path", "")
-        resp = await client.get(f"{self._base}/repos/{owner}/{repo}/contents/{path}")
+        resp, cache = await self._conditional_get(
+            f"{self._base}/repos/{owner}/{repo}/contents/{path}"
+        )
         if resp.status_code == 200:
             import base64
             data = resp.json()
             content = base64.b64decode(data["content"]).decode("utf-8")
-            return ToolResult(success=True, output={"content": content, "sha": data["sha"]})
+            return ToolResult(
+                success=True,
+                output={"content": content, "sha": data["sha"]},
+                metadata={"cache": cache},
+            )
         return ToolResult(success=False, error=f"Status {resp.status_code}: {resp.text[:200]}")
 
-    async def _create_file(self, client: httpx.AsyncClient, params: dict) -> ToolResult:
+    async def _create_file(self, params: dict) -> ToolResult:
         import base64
         owner = params.get("owner", "")
         repo = params.get("repo", "")
         path = params.get("path", "")
         content = base64.b64encode(params.get("content", "").encode()).decode()
-        resp = await client.put(
+        resp = await self._request(
+            "PUT",
             f"{self._base}/repos/{owner}/{repo}/contents/{path}",
             json={"message": f"Create {path}", "content": content},
         )
@@ -111,10 +252,106 @@ class GitHubTool(MCPTool):
             return ToolResult(success=True, output={"path": path})
         return ToolResult(success=False, error=f"Status {resp.status_code}: {resp.text[:200]}")
 
-    async def _create_issue(self, client: httpx.AsyncClient, params: dict) -> ToolResult:
+    async def _commit_files(self, params: dict) -> ToolResult:
+        """Commit many files at once via the Git Data API.
+
+        Blobs are created concurrently, then a single tree, a single commit
+        and one ref update replace the one-PUT-per-file contents API flow.
+        """
         owner = params.get("owner", "")
         repo = params.get("repo", "")
-        resp = await client.post(
+        files = params.get("files") or []
+        if not files:
+            return ToolResult(success=False, error="No files to commit")
+        # Validate everything before the first request, not after the blobs.
+        if not isinstance(files, list) or not all(
+            isinstance(f, dict)
+            and isinstance(f.get("path"), str)
+            and f["path"]
+            and isinstance(f.get("content"), str)
+            for f in files
+        ):
+            return ToolResult(
+                success=False, error="files must be a list of {path, content} string objects"
+            )
+        git = f"{self._base}/repos/{owner}/{repo}/git"
+
+        branch = params.get("branch")
+        if not branch:
+            resp = await self._request("GET", f"{self._base}/repos/{owner}/{repo}")
+            if resp.status_code != 200:
+                return self._status_error(resp)
+            branch = resp.json()["default_branch"]
+
+        resp = await self._request("GET", f"{git}/ref/heads/{branch}")
+        if resp.status_code != 200:
+            return self._status_error(resp)
+        head_sha = resp.json()["object"]["sha"]
+
+        resp = await self._request("GET", f"{git}/commits/{head_sha}")
+        if resp.status_code != 200:
+            return self._status_error(resp)
+        base_tree = resp.json()["tree"]["sha"]
+
+        semaphore = asyncio.Semaphore(self._blob_concurrency)
+
+        async def create_blob(content: str) -> httpx.Response:
+            async with semaphore:
+                return await self._request(
+                    "POST", f"{git}/blobs", json={"content": content, "encoding": "utf-8"}
+                )
+
+        blobs = await asyncio.gather(*(create_blob(f["content"]) for f in files))
+        for f, blob in zip(files, blobs):
+            if blob.status_code != 201:
+                return ToolResult(
+                    success=False,
+                    error=f"Blob for {f.get('path')}: status {blob.status_code}: {blob.text[:200]}",
+                )
+
+        resp = await self._request(
+            "POST",
+            f"{git}/trees",
+            json={
+                "base_tree": base_tree,
+                "tree": [
+                    {"path": f["path"], "mode": "100644", "type": "blob", "sha": blob.json()["sha"]}
+                    for f, blob in zip(files, blobs)
+                ],
+            },
+        )
+        if resp.status_code != 201:
+            return self._status_error(resp)
+        tree_sha = resp.json()["sha"]
+
+        message = params.get("message") or f"Add {len(files)} files"
+        resp = await self._request(
+            "POST",
+            f"{git}/commits",
+            json={"message": message, "tree": tree_sha, "parents": [head_sha]},
+        )
+        if resp.status_code != 201:
+            return self._status_error(resp)
+        commit_sha = resp.json()["sha"]
+
+        resp = await self._request(
+            "PATCH", f"{git}/refs/heads/{branch}", json={"sha": commit_sha, "force": False}
+        )
+        if resp.status_code != 200:
+            return self._status_error(resp)
+        return ToolResult(
+            success=True,
+            output={"commit": commit_sha, "branch": branch, "paths": [f["path"] for f in files]},
+        )
+
+    def _status_error(self, resp: httpx.Response) -> ToolResult:
+        return ToolResult(success=False, error=f"Status {resp.status_code}: {resp.text[:200]}")
+
+    async def _create_issue(self, params: dict) -> ToolResult:
+        owner = params.get("owner", "")
+        repo = params.get("repo", "")
+        resp = await self._request(
+            "POST",
             f"{self._base}/repos/{owner}/{repo}/issues",
             json={"title": params.get("title", ""), "body": params.get("body", "")},
         )
@@ -123,9 +360,11 @@ class GitHubTool(MCPTool):
             return ToolResult(success=True, output={"number": data["number"], "url": data["html_url"]})
         return ToolResult(success=False, error=f"Status {resp.status_code}: {resp.text[:200]}")
 
-    async def _list_repos(self, client: httpx.AsyncClient, params: dict) -> ToolResult:
-        resp = await client.get(f"{self._base}/user/repos", params={"per_page": 10, "sort": "updated"})
+    async def _list_repos(self, params: dict) -> ToolResult:
+        resp, cache = await self._conditional_get(
+            f"{self._base}/user/repos", params={"per_page": 10, "sort": "updated"}
+        )
         if resp.status_code == 200:
             repos = [{"name": r["name"], "url": r["html_url"]} for r in resp.json()]
-            return ToolResult(success=True, output=repos)
+            return ToolResult(success=True, output=repos, metadata={"cache": cache})
         return ToolResult(success=False, error=f"Status {resp.status_code}")
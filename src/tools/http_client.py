@@ -0,0 +1,39 @@
+"""Pooled HTTP client ownership shared by the network-backed tools."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+
+import httpx
+
+
+class PooledClientMixin(ABC):
+    """Holds one long-lived ``httpx.AsyncClient``, created on first use.
+
+    A client passed in belongs to the caller and is never closed here; one
+    created by ``_new_client`` (lazily, so its connection pool binds to the
+    running event loop) is closed by ``aclose``.
+    """
+
+    _client: httpx.AsyncClient | None
+    _owns_client: bool
+
+    def _init_client(self, client: httpx.AsyncClient | None) -> None:
+        self._client = client
+        self._owns_client = client is None
+
+    @abstractmethod
+    def _new_client(self) -> httpx.AsyncClient:
+        """Build the client this object will own."""
+        ...
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self._new_client()
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client if this object created it."""
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
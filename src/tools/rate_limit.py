@@ -0,0 +1,172 @@
+"""Rate-limit-aware request pacing for the GitHub API."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# GitHub's guidance for secondary limits without a Retry-After header.
+SECONDARY_LIMIT_BACKOFF_SECONDS = 60.0
+
+
+class RateLimitExceeded(RuntimeError):
+    """Raised when honouring the rate limit would mean waiting too long."""
+
+    def __init__(self, wait_seconds: float):
+        super().__init__(
+            f"GitHub rate limit exhausted; next request allowed in {wait_seconds:.0f}s"
+        )
+        self.wait_seconds = wait_seconds
+
+
+class RateLimiter:
+    """Token bucket driven by GitHub's advertised rate-limit budget.
+
+    The bucket refills at ``remaining / seconds_until_reset`` so requests are
+    spread evenly across the window instead of bursting into a lockout, with
+    up to ``burst`` requests allowed back to back. ``Retry-After`` and
+    exhausted budgets block all callers until the advertised time. Waits
+    longer than ``max_wait_seconds`` raise ``RateLimitExceeded`` instead of
+    stalling the agent.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 10,
+        burst: int = 10,
+        reserve: int = 0,
+        max_wait_seconds: float = 60.0,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ):
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self.used: int | None = None
+        self.reset_at: float | None = None
+        self._burst = max(1, burst)
+        self._reserve = max(0, reserve)
+        self._max_wait = max_wait_seconds
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self._burst)
+        self._refilled_at = clock()
+        self._blocked_until = 0.0
+        self._throttled = 0
+        self._lock = asyncio.Lock()
+        self._concurrency = asyncio.Semaphore(max(1, max_concurrent))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """Wait for budget and a concurrency slot; yields the seconds waited."""
+        waited = await self._acquire()
+        async with self._concurrency:
+            yield waited
+
+    async def _acquire(self) -> float:
+        # The lock queues callers so pacing delays are applied in FIFO order.
+        async with self._lock:
+            delay = self._delay()
+            if delay > self._max_wait:
+                raise RateLimitExceeded(delay)
+            if delay > 0:
+                logger.info("Pacing GitHub request for %.2fs", delay)
+                await self._sleep(delay)
+            self._refill()
+            self._tokens -= 1
+            if self.remaining is not None:
+                self.remaining = max(0, self.remaining - 1)
+            return delay
+
+    def _delay(self) -> float:
+        now = self._clock()
+        if self._blocked_until > now:
+            return self._blocked_until - now
+        if self.remaining is not None and self.reset_at is not None and self.reset_at > now:
+            if self.remaining <= self._reserve:
+                return self.reset_at - now
+        self._refill()
+        if self._tokens >= 1:
+            return 0.0
+        rate = self._rate()
+        return (1 - self._tokens) / rate if rate else 0.0
+
+    def _rate(self) -> float | None:
+        """Sustainable requests per second, or None before any budget is known."""
+        now = self._clock()
+        if self.remaining is None or self.reset_at is None or self.reset_at <= now:
+            # Unknown budget, or the window has already reset.
+            return None
+        window = max(1.0, self.reset_at - now)
+        return max(self.remaining - self._reserve, 0) / window
+
+    def _refill(self) -> None:
+        now = self._clock()
+        rate = self._rate()
+        if rate is None:
+            self._tokens = float(self._burst)
+        else:
+            self._tokens = min(self._burst, self._tokens + (now - self._refilled_at) * rate)
+        self._refilled_at = now
+
+    def update(self, response: httpx.Response) -> bool:
+        """Record the budget advertised by ``response``.
+
+        Returns True when the response was a rate-limit rejection that is
+        worth retrying once the limiter's block has passed.
+        """
+        headers = response.headers
+        now = self._clock()
+        if "X-RateLimit-Limit" in headers:
+            self.limit = _int(headers.get("X-RateLimit-Limit"))
+            self.remaining = _int(headers.get("X-RateLimit-Remaining"))
+            self.used = _int(headers.get("X-RateLimit-Used"))
+            reset = _int(headers.get("X-RateLimit-Reset"))
+            self.reset_at = float(reset) if reset is not None else None
+
+        if response.status_code not in (403, 429):
+            return False
+
+        retry_after = _int(headers.get("Retry-After"))
+        if retry_after is not None:
+            block = now + retry_after
+        elif self.remaining == 0 and self.reset_at is not None:
+            block = self.reset_at
+        elif response.status_code == 429 or "rate limit" in response.text.lower():
+            block = now + SECONDARY_LIMIT_BACKOFF_SECONDS
+        else:
+            # A plain 403 (permissions, SSO) is not a rate limit.
+            return False
+
+        self._blocked_until = max(self._blocked_until, block)
+        self._throttled += 1
+        logger.warning(
+            "GitHub rate limited (HTTP %d); blocked for %.0fs", response.status_code, block - now
+        )
+        return True
+
+    def status(self) -> dict[str, Any]:
+        """Remaining-budget gauges for metrics and ToolResult metadata."""
+        now = self._clock()
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "used": self.used,
+            "reset_in_seconds": max(0.0, self.reset_at - now) if self.reset_at else None,
+            "blocked_for_seconds": max(0.0, self._blocked_until - now),
+            "throttled_responses": self._throttled,
+        }
+
+
+def _int(value: str | None) -> int | None:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
@@ -0,0 +1,123 @@
+"""Kernel resource limits for sandboxed code execution."""
+
+from __future__ import annotations
+
+import json
+import logging
+import signal
+import uuid
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceLimits(BaseModel):
+    """Per-run ceilings applied to sandbox processes.
+
+    The ``setrlimit`` limits are set by ``sandbox_worker.py`` at startup,
+    before any untrusted code runs, rather than in a ``preexec_fn`` (which
+    is unsafe to run in a parent that has threads). For cold-start runs the
+    worker then ``exec``s the real interpreter, which inherits them.
+
+    When ``cgroup_parent`` points at a delegated cgroup v2 directory, each
+    cold-start run also gets its own child cgroup with ``memory.max`` and
+    ``pids.max``, which (unlike rlimits) cover every process the code forks.
+    That ``pids.max`` is how ``processes`` is enforced: ``RLIMIT_NPROC``
+    counts every process owned by the user, not just this run's, so it is
+    only set when ``nproc_rlimit`` is true, which makes sense only when the
+    sandbox runs under a dedicated UID. ``None`` leaves a limit unset.
+    """
+
+    cpu_seconds: int | None = None
+    memory_bytes: int | None = None
+    open_files: int | None = None
+    processes: int | None = None
+    nproc_rlimit: bool = False
+    cgroup_parent: str | None = None
+
+    def describe(self) -> dict[str, Any]:
+        """Configured limits, for ToolResult metadata."""
+        return self.model_dump(exclude_none=True, exclude_defaults=True)
+
+    def rlimits(self) -> dict[str, tuple[int, int]]:
+        """``(soft, hard)`` pairs keyed by ``resource`` constant name."""
+        limits: dict[str, tuple[int, int]] = {}
+        if self.cpu_seconds is not None:
+            # Soft limit raises SIGXCPU; the hard limit one second later kills.
+            limits["RLIMIT_CPU"] = (self.cpu_seconds, self.cpu_seconds + 1)
+        if self.memory_bytes is not None:
+            limits["RLIMIT_AS"] = (self.memory_bytes, self.memory_bytes)
+        if self.open_files is not None:
+            limits["RLIMIT_NOFILE"] = (self.open_files, self.open_files)
+        if self.processes is not None and self.nproc_rlimit:
+            limits["RLIMIT_NPROC"] = (self.processes, self.processes)
+        return limits
+
+    def worker_args(self, cgroup: Path | None = None) -> list[str]:
+        """Arguments telling ``sandbox_worker.py`` to apply these limits.
+
+        The worker also joins ``cgroup`` if given. Empty when there is
+        nothing to apply.
+        """
+        rlimits = self.rlimits()
+        if not rlimits and cgroup is None:
+            return []
+        spec = {"rlimits": rlimits, "cgroup": str(cgroup) if cgroup else None}
+        return ["--limits", json.dumps(spec)]
+
+    def create_cgroup(self) -> Path | None:
+        """Create a per-run child cgroup, or return None if unavailable."""
+        if not self.cgroup_parent:
+            return None
+        path = Path(self.cgroup_parent) / f"agent-{uuid.uuid4().hex[:12]}"
+        try:
+            path.mkdir()
+            if self.memory_bytes is not None:
+                (path / "memory.max").write_text(str(self.memory_bytes))
+                (path / "memory.swap.max").write_text("0")
+            if self.processes is not None:
+                (path / "pids.max").write_text(str(self.processes))
+        except OSError as e:
+            logger.warning("cgroup v2 limits unavailable (%s); using rlimits only", e)
+            remove_cgroup(path)
+            return None
+        return path
+
+    def classify_breach(
+        self, returncode: int | None, stderr: str, cgroup: Path | None = None
+    ) -> str | None:
+        """Name the limit a finished run most likely hit, if any."""
+        if cgroup is not None and _oom_killed(cgroup):
+            return "memory"
+        if self.cpu_seconds is not None and returncode in (-signal.SIGXCPU, -signal.SIGKILL):
+            return "cpu"
+        if self.memory_bytes is not None and "MemoryError" in stderr:
+            return "memory"
+        if self.open_files is not None and "Too many open files" in stderr:
+            return "open_files"
+        if self.processes is not None and "Resource temporarily unavailable" in stderr:
+            return "processes"
+        return None
+
+
+def remove_cgroup(path: Path | None) -> None:
+    if path is None:
+        return
+    try:
+        path.rmdir()
+    except OSError as e:
+        logger.debug("Could not remove cgroup %s: %s", path, e)
+
+
+def _oom_killed(cgroup: Path) -> bool:
+    try:
+        for line in (cgroup / "memory.events").read_text().splitlines():
+            key, _, value = line.partition(" ")
+            if key == "oom_kill" and int(value) > 0:
+                return True
+    except (OSError, ValueError):
+        pass
+    return False
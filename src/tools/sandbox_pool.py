@@ -0,0 +1,246 @@
+"""Warm pool of sandbox worker processes for CodeExecutorTool."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+from pathlib import Path
+from typing import Any
+
+from .sandbox_limits import ResourceLimits
+
+logger = logging.getLogger(__name__)
+
+# Also the launcher that applies ResourceLimits to cold-start runs.
+WORKER_SCRIPT = Path(__file__).with_name("sandbox_worker.py")
+
+RESPONSE_KEYS = frozenset({"stdout", "stderr", "returncode", "truncated", "dirty"})
+
+
+class SandboxWorker:
+    """One pre-spawned interpreter running ``sandbox_worker.py``."""
+
+    def __init__(
+        self,
+        python: str,
+        env: dict[str, str],
+        max_output: int,
+        limits: ResourceLimits | None = None,
+        cgroup: Path | None = None,
+    ):
+        self._python = python
+        self._env = env
+        self._limits = limits or ResourceLimits()
+        self._cgroup = cgroup
+        # Room for stdout + stderr at the cap with worst-case JSON escaping.
+        self._line_limit = max(2**16, 12 * max_output + 4096)
+        self._proc: asyncio.subprocess.Process | None = None
+        self.runs = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None
+
+    async def start(self) -> None:
+        """Spawn the interpreter and wait until it has finished warming up."""
+        self._proc = await asyncio.create_subprocess_exec(
+            self._python,
+            str(WORKER_SCRIPT),
+            # CPU time is budgeted per run by the worker itself.
+            *self._limits.model_copy(update={"cpu_seconds": None}).worker_args(self._cgroup),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env=self._env,
+            limit=self._line_limit,
+        )
+        line = await self._proc.stdout.readline()  # type: ignore[union-attr]
+        if not line or not json.loads(line).get("ready"):
+            await self.kill()
+            raise RuntimeError("Sandbox worker failed to start")
+
+    async def run(self, code: str, timeout: float, max_output: int) -> dict[str, Any]:
+        """Run one snippet; kills the worker and re-raises on timeout."""
+        proc = self._proc
+        assert proc is not None and proc.stdin is not None and proc.stdout is not None
+        self.runs += 1
+        request = json.dumps(
+            {"code": code, "max_output": max_output, "cpu_seconds": self._limits.cpu_seconds}
+        ) + "\n"
+        try:
+            proc.stdin.write(request.encode("utf-8"))
+            await proc.stdin.drain()
+            line = await asyncio.wait_for(proc.stdout.readline(), timeout=timeout)
+        except asyncio.TimeoutError:
+            await self.kill()
+            raise
+        except (BrokenPipeError, ConnectionResetError):
+            line = b""
+
+        if not line:
+            # The snippet took the interpreter down (os._exit, crash, signal).
+            returncode = await proc.wait()
+            return {
+                "stdout": "",
+                "stderr": "",
+                "returncode": returncode,
+                "truncated": False,
+                "dirty": True,
+            }
+        try:
+            result = json.loads(line)
+        except ValueError:
+            result = None
+        if not isinstance(result, dict) or not RESPONSE_KEYS <= result.keys():
+            # The snippet broke the worker's protocol code: treat it as a crash.
+            await self.kill()
+            return {
+                "stdout": "",
+                "stderr": "Sandbox worker sent an invalid response\n",
+                "returncode": 1,
+                "truncated": False,
+                "dirty": True,
+            }
+        return result
+
+    async def kill(self) -> None:
+        if self._proc is None:
+            return
+        if self._proc.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                self._proc.kill()
+        await self._proc.wait()
+
+
+class WorkerPool:
+    """Keeps ``size`` warm sandbox workers and hands them out one run at a time.
+
+    Workers are retired after ``max_runs_per_worker`` runs, after a timeout,
+    or as soon as a snippet leaks process-wide state; a replacement is
+    spawned in the background so the next dispatch finds a warm process.
+    Every worker joins ``cgroup`` when one is given.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        env: dict[str, str],
+        max_output: int,
+        max_runs_per_worker: int = 50,
+        python: str = "python3",
+        limits: ResourceLimits | None = None,
+        cgroup: Path | None = None,
+    ):
+        self._size = max(1, size)
+        self._env = env
+        self._max_output = max_output
+        self._max_runs = max(1, max_runs_per_worker)
+        self._python = python
+        self._limits = limits
+        self._cgroup = cgroup
+        self._idle: list[SandboxWorker] = []
+        self._busy = 0
+        self._spawning = 0
+        self._slots = asyncio.Semaphore(self._size)
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._closed = False
+
+    async def start(self) -> None:
+        """Pre-spawn the whole pool so the first runs find warm workers."""
+        self._refill()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def run(self, code: str, timeout: float) -> dict[str, Any]:
+        """Run ``code`` on a warm worker; raises ``asyncio.TimeoutError`` on timeout."""
+        (result,) = await self.run_batch([(code, timeout)])
+        if result.get("timeout"):
+            raise asyncio.TimeoutError
+        return result
+
+    async def run_batch(self, snippets: list[tuple[str, float]]) -> list[dict[str, Any]]:
+        """Run several snippets back to back on one worker.
+
+        Each snippet gets its own namespace and timeout. A timed-out snippet
+        is reported as ``{"timeout": True}``; the worker is killed and a
+        fresh one takes the remaining snippets, as it also does after a
+        state leak.
+        """
+        if self._closed:
+            raise RuntimeError("Worker pool is closed")
+        async with self._slots:
+            self._busy += 1
+            worker: SandboxWorker | None = None
+            finished = False
+            try:
+                results: list[dict[str, Any]] = []
+                for code, timeout in snippets:
+                    if worker is None or not worker.alive:
+                        worker = await self._checkout()
+                    try:
+                        result = await worker.run(code, timeout, self._max_output)
+                    except asyncio.TimeoutError:
+                        results.append({"timeout": True})
+                        continue
+                    results.append(result)
+                    if result.get("dirty") or worker.runs >= self._max_runs:
+                        await worker.kill()
+                finished = True
+                return results
+            finally:
+                self._busy -= 1
+                # A worker interrupted mid-run may still be executing: never reuse it.
+                if finished and worker is not None and worker.alive and not self._closed:
+                    self._idle.append(worker)
+                else:
+                    if worker is not None:
+                        await worker.kill()
+                    self._refill()
+
+    async def close(self) -> None:
+        """Stop background spawning and kill every worker."""
+        self._closed = True
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        idle, self._idle = self._idle, []
+        for worker in idle:
+            await worker.kill()
+
+    async def _checkout(self) -> SandboxWorker:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.alive:
+                return worker
+            await worker.kill()
+        return await self._spawn()
+
+    async def _spawn(self) -> SandboxWorker:
+        worker = SandboxWorker(
+            self._python, self._env, self._max_output, self._limits, self._cgroup
+        )
+        await worker.start()
+        return worker
+
+    def _refill(self) -> None:
+        """Top the pool back up to ``size`` live workers in the background."""
+        while not self._closed and len(self._idle) + self._busy + self._spawning < self._size:
+            self._spawning += 1
+            task = asyncio.create_task(self._spawn_idle())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _spawn_idle(self) -> None:
+        try:
+            worker = await self._spawn()
+        except Exception as exc:
+            logger.warning("Failed to spawn sandbox worker: %s", exc)
+            return
+        finally:
+            self._spawning -= 1
+        if self._closed:
+            await worker.kill()
+        else:
+            self._idle.append(worker)
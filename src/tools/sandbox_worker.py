@@ -0,0 +1,219 @@
+"""Sandbox worker process for CodeExecutorTool's warm interpreter pool.
+
+Run as a standalone script (``python3 sandbox_worker.py``); it must not
+import anything from the agent packages. The parent talks to it over
+stdin/stdout with one JSON object per line:
+
+    -> {"code": "...", "max_output": 10000, "cpu_seconds": null}
+    <- {"stdout": "...", "stderr": "...", "returncode": 0,
+        "truncated": false, "dirty": false}
+
+Each snippet runs in a fresh namespace. ``dirty`` is set when the snippet
+left process-wide state behind (sys.path, environment, cwd, live threads,
+non-stdlib modules, or rebound attributes of builtins and already loaded
+stdlib modules), telling the parent to retire this worker.
+
+``--limits SPEC`` (JSON: ``{"rlimits": {name: [soft, hard]}, "cgroup":
+path}``) applies resource limits before anything else runs. Arguments
+after ``--`` make the script a launcher instead: it applies the limits and
+``exec``s ``python3`` with those arguments, which inherits them.
+"""
+
+from __future__ import annotations
+
+import functools
+import io
+import json
+import math
+import os
+import sys
+import sysconfig
+import threading
+import traceback
+
+# Modules most snippets touch; importing them here is part of "warming up".
+PRELOAD = ("collections", "functools", "itertools", "json", "math", "re")
+
+# Bound at import, before any snippet runs, so rebinding ``json.dumps`` or
+# ``json.loads`` through ``sys.modules`` cannot break the protocol.
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+_decode = json.JSONDecoder().decode
+
+_STDLIB_DIRS = tuple(
+    {os.path.realpath(sysconfig.get_paths()[key]) for key in ("stdlib", "platstdlib")}
+)
+
+
+class CappedWriter(io.TextIOBase):
+    """Text sink that keeps at most ``limit`` characters and drops the rest."""
+
+    def __init__(self, limit: int):
+        self._parts: list[str] = []
+        self._size = 0
+        self._limit = limit
+        self.truncated = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        if not isinstance(s, str):
+            raise TypeError(f"write() argument must be str, not {type(s).__name__}")
+        room = self._limit - self._size
+        if len(s) > room:
+            self.truncated = True
+            s = s[: max(room, 0)]
+        if s:
+            self._parts.append(s)
+            self._size += len(s)
+        return len(s)
+
+    def getvalue(self) -> str:
+        return "".join(self._parts)
+
+
+@functools.lru_cache(maxsize=None)
+def _in_stdlib(path: str) -> bool:
+    return os.path.realpath(path).startswith(_STDLIB_DIRS)
+
+
+def _module_state() -> tuple[frozenset[str], dict[str, tuple[int, ...]]]:
+    """Names of non-stdlib modules, and a fingerprint of every other module.
+
+    The fingerprint is the ids of a module's attribute values, so rebinding
+    anything in ``builtins`` or a stdlib module (``math.pi = 3``) changes it.
+    """
+    foreign = []
+    fingerprints = {}
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if path and not _in_stdlib(path):
+            foreign.append(name)
+        else:
+            fingerprints[name] = tuple(map(id, getattr(module, "__dict__", {}).values()))
+    return frozenset(foreign), fingerprints
+
+
+def _snapshot() -> tuple:
+    foreign, fingerprints = _module_state()
+    return (
+        (list(sys.path), dict(os.environ), os.getcwd(), threading.active_count(), foreign),
+        fingerprints,
+    )
+
+
+def _leaked(before: tuple, after: tuple) -> bool:
+    """Whether a snippet changed process-wide state between two snapshots.
+
+    Stdlib modules first imported by the snippet are fine; any module that
+    was already loaded must be untouched.
+    """
+    (state, fingerprints), (state_after, fingerprints_after) = before, after
+    return state != state_after or any(
+        fingerprints_after.get(name) != fingerprint
+        for name, fingerprint in fingerprints.items()
+    )
+
+
+def _set_cpu_budget(seconds: int | None) -> None:
+    """Allow ``seconds`` more CPU time; RLIMIT_CPU counts the whole process life."""
+    try:
+        import resource
+    except ImportError:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if seconds is None:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime) + seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def apply_limits(spec: dict) -> None:
+    """Join ``spec["cgroup"]`` and set ``spec["rlimits"]`` on this process."""
+    if spec.get("cgroup"):
+        with open(os.path.join(spec["cgroup"], "cgroup.procs"), "w") as f:
+            f.write(str(os.getpid()))
+    try:
+        import resource
+    except ImportError:
+        return
+    for name, (soft, hard) in spec.get("rlimits", {}).items():
+        resource.setrlimit(getattr(resource, name), (soft, hard))
+
+
+def run_snippet(code: str, max_output: int) -> dict:
+    """Execute ``code`` in a fresh namespace and report output like a subprocess."""
+    stdout, stderr = CappedWriter(max_output), CappedWriter(max_output)
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    before = _snapshot()
+    returncode = 0
+
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        exec(compile(code, "<string>", "exec"), namespace)
+    except SystemExit as exc:
+        if exc.code is None:
+            returncode = 0
+        elif isinstance(exc.code, int):
+            returncode = exc.code
+        else:
+            print(exc.code, file=stderr)
+            returncode = 1
+    except BaseException as exc:
+        # Drop this module's frame so the traceback starts at the snippet.
+        traceback.print_exception(type(exc), exc, exc.__traceback__.tb_next, file=stderr)
+        returncode = 1
+    finally:
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+        namespace.clear()
+
+    return {
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "returncode": returncode,
+        "truncated": stdout.truncated or stderr.truncated,
+        "dirty": _leaked(before, _snapshot()),
+    }
+
+
+def main(argv: list[str]) -> None:
+    if argv[:1] == ["--limits"]:
+        apply_limits(_decode(argv[1]))
+        argv = argv[2:]
+    if argv[:1] == ["--"]:
+        os.execv(sys.executable, [sys.executable, *argv[1:]])
+    serve()
+
+
+def serve() -> None:
+    # Keep private copies of the protocol pipes, then point fds 0-2 at
+    # /dev/null so snippets cannot read requests or corrupt responses.
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    responses = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    sys.stdin = open(os.devnull, encoding="utf-8")
+
+    for name in PRELOAD:
+        __import__(name)
+
+    write, flush = responses.write, responses.flush
+    write(_encode({"ready": True}) + "\n")
+    flush()
+
+    for line in requests:
+        request = _decode(line)
+        _set_cpu_budget(request.get("cpu_seconds"))
+        result = run_snippet(request["code"], request.get("max_output", 10000))
+        _set_cpu_budget(None)
+        write(_encode(result) + "\n")
+        flush()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,257 @@
+"""Search backends for the web search tool — DuckDuckGo and a local BM25 index."""
+
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import mmap
+import re
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from agent.models import ToolResult
+
+from .http_client import PooledClientMixin
+
+_TOKEN = re.compile(r"\w+")
+
+# Index file names inside an index directory.
+POSTINGS_FILE = "postings.bin"
+LEXICON_FILE = "lexicon.json"
+DOCS_FILE = "docs.json"
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.casefold())
+
+
+class SearchBackend(ABC):
+    """Abstract source of search results for ``WebSearchTool``.
+
+    ``search`` returns a ``ToolResult`` whose output is
+    ``{"results": [{title, snippet, url, ...}], "query": ...}``.
+    """
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Short identifier reported in result metadata."""
+        ...
+
+    @abstractmethod
+    async def search(self, query: str, max_results: int) -> ToolResult:
+        """Run one query."""
+        ...
+
+    async def aclose(self) -> None:
+        """Release any long-lived resources held by the backend."""
+
+
+class DuckDuckGoBackend(PooledClientMixin, SearchBackend):
+    """DuckDuckGo Instant Answer API (no key required) over a pooled client."""
+
+    URL = "https://api.duckduckgo.com/"
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient | None = None,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 5,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 15,
+    ):
+        self._init_client(client)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._timeout = timeout
+
+    @property
+    def name(self) -> str:
+        return "duckduckgo"
+
+    def _new_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(timeout=self._timeout, limits=self._limits)
+
+    async def search(self, query: str, max_results: int) -> ToolResult:
+        try:
+            resp = await self._get_client().get(
+                self.URL,
+                params={"q": query, "format": "json", "no_html": 1, "skip_disambig": 1},
+            )
+
+            if resp.status_code != 200:
+                return ToolResult(success=False, error=f"Search failed: HTTP {resp.status_code}")
+
+            data = resp.json()
+            results = []
+
+            # Abstract (direct answer)
+            if data.get("Abstract"):
+                results.append({
+                    "title": data.get("Heading", ""),
+                    "snippet": data["Abstract"],
+                    "url": data.get("AbstractURL", ""),
+                    "source": data.get("AbstractSource", ""),
+                })
+
+            # Related topics
+            for topic in data.get("RelatedTopics", [])[:max_results]:
+                if isinstance(topic, dict) and "Text" in topic:
+                    results.append({
+                        "title": topic.get("Text", "")[:100],
+                        "snippet": topic.get("Text", ""),
+                        "url": topic.get("FirstURL", ""),
+                    })
+
+            if not results:
+                return ToolResult(
+                    success=True,
+                    output={"results": [], "message": "No results found"},
+                )
+
+            return ToolResult(
+                success=True,
+                output={"results": results[:max_results], "query": query},
+            )
+
+        except httpx.HTTPError as e:
+            return ToolResult(success=False, error=f"HTTP error: {e}")
+
+
+class LocalIndexBackend(SearchBackend):
+    """Offline BM25 search over an on-disk inverted index.
+
+    ``build`` indexes a directory of text documents into ``index_dir``:
+    ``postings.bin`` holds ``(doc_id, term_frequency)`` uint32 pairs grouped
+    by term, ``lexicon.json`` maps each term to its slice of that file, and
+    ``docs.json`` holds per-document metadata. Loading memory-maps the
+    postings, so opening even a large index reads only the lexicon and a
+    query touches just the postings of its own terms.
+    """
+
+    def __init__(self, index_dir: str, k1: float = 1.2, b: float = 0.75):
+        self._dir = Path(index_dir)
+        self._k1 = k1
+        self._b = b
+        self._lexicon: dict[str, list[int]] = json.loads(
+            (self._dir / LEXICON_FILE).read_text(encoding="utf-8")
+        )
+        meta = json.loads((self._dir / DOCS_FILE).read_text(encoding="utf-8"))
+        if meta["byteorder"] != sys.byteorder:
+            raise ValueError(f"Index was built on a {meta['byteorder']}-endian machine")
+        self._docs: list[dict[str, Any]] = meta["docs"]
+        self._avgdl: float = meta["avgdl"] or 1.0
+
+        self._file = open(self._dir / POSTINGS_FILE, "rb")
+        self._map: mmap.mmap | None = None
+        self._postings: memoryview | array = array("I")
+        if self._lexicon:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._postings = memoryview(self._map).cast("I")
+
+    @classmethod
+    def build(
+        cls,
+        source_dir: str,
+        index_dir: str,
+        patterns: tuple[str, ...] = ("*.md", "*.txt", "*.rst"),
+        **kwargs: Any,
+    ) -> LocalIndexBackend:
+        """Index every file under ``source_dir`` matching ``patterns``."""
+        source = Path(source_dir)
+        paths = sorted({p for pattern in patterns for p in source.rglob(pattern) if p.is_file()})
+
+        docs: list[dict[str, Any]] = []
+        postings: dict[str, list[tuple[int, int]]] = {}
+        for doc_id, path in enumerate(paths):
+            text = path.read_text(encoding="utf-8", errors="replace")
+            terms = tokenize(text)
+            for term, tf in Counter(terms).items():
+                postings.setdefault(term, []).append((doc_id, tf))
+            first_line = text.strip().splitlines()[0] if text.strip() else path.stem
+            docs.append({
+                "path": path.relative_to(source).as_posix(),
+                "url": path.resolve().as_uri(),
+                "title": first_line.lstrip("# ").strip()[:100],
+                "snippet": " ".join(text.split())[:300],
+                "length": len(terms),
+            })
+
+        flat = array("I")
+        lexicon: dict[str, list[int]] = {}
+        for term in sorted(postings):
+            lexicon[term] = [len(flat) // 2, len(postings[term])]
+            for doc_id, tf in postings[term]:
+                flat.extend((doc_id, tf))
+
+        out = Path(index_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        with open(out / POSTINGS_FILE, "wb") as f:
+            flat.tofile(f)
+        (out / LEXICON_FILE).write_text(json.dumps(lexicon), encoding="utf-8")
+        total = sum(d["length"] for d in docs)
+        (out / DOCS_FILE).write_text(
+            json.dumps({
+                "docs": docs,
+                "avgdl": total / len(docs) if docs else 0.0,
+                "byteorder": sys.byteorder,
+            }),
+            encoding="utf-8",
+        )
+        return cls(index_dir, **kwargs)
+
+    @property
+    def name(self) -> str:
+        return "local_index"
+
+    async def aclose(self) -> None:
+        """Unmap the postings file."""
+        if isinstance(self._postings, memoryview):
+            self._postings.release()
+        self._postings = array("I")
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    async def search(self, query: str, max_results: int) -> ToolResult:
+        n_docs = len(self._docs)
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            entry = self._lexicon.get(term)
+            if entry is None:
+                continue
+            start, df = entry
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            pairs = self._postings[start * 2:(start + df) * 2]
+            for i in range(0, len(pairs), 2):
+                doc_id, tf = pairs[i], pairs[i + 1]
+                norm = 1 - self._b + self._b * self._docs[doc_id]["length"] / self._avgdl
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self._k1 + 1) / (
+                    tf + self._k1 * norm
+                )
+
+        top = heapq.nlargest(max_results, scores.items(), key=lambda item: (item[1], -item[0]))
+        results = [
+            {
+                "title": self._docs[doc_id]["title"],
+                "snippet": self._docs[doc_id]["snippet"],
+                "url": self._docs[doc_id]["url"],
+                "path": self._docs[doc_id]["path"],
+                "score": round(score, 4),
+            }
+            for doc_id, score in top
+        ]
+        if not results:
+            return ToolResult(success=True, output={"results": [], "message": "No results found"})
+        return ToolResult(success=True, output={"results": results, "query": query})
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-import os
+import asyncio
 from typing import Any
 
 import httpx
@@ -10,10 +10,55 @@ import httpx
 from agent.models import ToolResult
 
 from .base import MCPTool
+from .cache import TTLCache
+from .search_backends import DuckDuckGoBackend, SearchBackend
 
 
 class WebSearchTool(MCPTool):
-    """MCP tool for web search using DuckDuckGo Instant Answer API (no key required)."""
+    """MCP tool for web search through a pluggable ``SearchBackend``.
+
+    The default backend is the DuckDuckGo Instant Answer API (no key
+    required) over one pooled HTTP client; pass ``backend`` to search
+    elsewhere, e.g. a ``LocalIndexBackend`` for offline runs. A ``client``
+    only configures the default backend, so passing both is an error. Like
+    a passed client, a passed backend belongs to the caller: ``aclose`` only
+    closes a backend this tool created.
+
+    Successful results are cached for ``cache_ttl_seconds`` under the
+    normalised query and ``max_results``, and concurrent identical queries
+    are coalesced onto a single in-flight request (single-flight), so
+    retries and parallel agents repeating a search cost one backend call.
+
+    ``queries`` runs several searches in one call, at most
+    ``fanout_concurrency`` at a time, and returns each query's results plus
+    one list merged across queries and deduplicated by URL.
+    """
+
+    def __init__(
+        self,
+        backend: SearchBackend | None = None,
+        client: httpx.AsyncClient | None = None,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 5,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 15,
+        cache_size: int = 256,
+        cache_ttl_seconds: float = 600.0,
+        fanout_concurrency: int = 4,
+    ):
+        if backend is not None and client is not None:
+            raise ValueError("Pass either backend or client, not both")
+        self._owns_backend = backend is None
+        self._backend = backend or DuckDuckGoBackend(
+            client,
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            timeout=timeout,
+        )
+        self._cache = TTLCache(cache_size, cache_ttl_seconds) if cache_size > 0 else None
+        self._inflight: dict[tuple[str, int], asyncio.Task[ToolResult]] = {}
+        self._fanout_concurrency = max(1, fanout_concurrency)
 
     @property
     def name(self) -> str:
@@ -29,59 +74,107 @@ class WebSearchTool(MCPTool):
             "type": "object",
             "properties": {
                 "query": {"type": "string", "description": "Search query"},
+                "queries": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Several queries searched concurrently and merged",
+                },
                 "max_results": {"type": "integer", "default": 5},
+                "cache": {
+                    "type": "boolean",
+                    "default": True,
+                    "description": "Set false to bypass the result cache",
+                },
             },
-            "required": ["query"],
+            "anyOf": [{"required": ["query"]}, {"required": ["queries"]}],
         }
 
     async def execute(self, params: dict[str, Any]) -> ToolResult:
-        query = params.get("query", "")
+        if "queries" in params:
+            return await self._execute_many(params)
+
+        query = " ".join(params.get("query", "").split())
         max_results = params.get("max_results", 5)
 
         if not query:
             return ToolResult(success=False, error="Query is required")
 
-        try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                resp = await client.get(
-                    "https://api.duckduckgo.com/",
-                    params={"q": query, "format": "json", "no_html": 1, "skip_disambig": 1},
-                )
-
-                if resp.status_code != 200:
-                    return ToolResult(success=False, error=f"Search failed: HTTP {resp.status_code}")
-
-                data = resp.json()
-                results = []
-
-                # Abstract (direct answer)
-                if data.get("Abstract"):
-                    results.append({
-                        "title": data.get("Heading", ""),
-                        "snippet": data["Abstract"],
-                        "url": data.get("AbstractURL", ""),
-                        "source": data.get("AbstractSource", ""),
-                    })
-
-                # Related topics
-                for topic in data.get("RelatedTopics", [])[:max_results]:
-                    if isinstance(topic, dict) and "Text" in topic:
-                        results.append({
-                            "title": topic.get("Text", "")[:100],
-                            "snippet": topic.get("Text", ""),
-                            "url": topic.get("FirstURL", ""),
-                        })
-
-                if not results:
-                    return ToolResult(
-                        success=True,
-                        output={"results": [], "message": "No results found"},
-                    )
-
-                return ToolResult(
-                    success=True,
-                    output={"results": results[:max_results], "query": query},
-                )
-
-        except httpx.HTTPError as e:
-            return ToolResult(success=False, error=f"HTTP error: {e}")
+        key = (query.casefold(), max_results)
+        use_cache = self._cache is not None and params.get("cache") is not False
+        if use_cache:
+            cached = self._cache.get(key)
+            if cached is not None:
+                result = cached.model_copy(deep=True)
+                result.metadata.update(cache="hit", backend=self._backend.name)
+                return result
+
+        task = self._inflight.get(key)
+        coalesced = task is not None
+        if task is None:
+            task = asyncio.ensure_future(self._backend.search(query, max_results))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller giving up doesn't cancel the others' request.
+        result = (await asyncio.shield(task)).model_copy(deep=True)
+
+        # Only successful searches are cached: failures may be transient.
+        if use_cache and result.success and not coalesced:
+            self._cache.put(key, result.model_copy(deep=True))
+        result.metadata.update(
+            cache="coalesced" if coalesced else "miss", backend=self._backend.name
+        )
+        return result
+
+    async def _execute_many(self, params: dict[str, Any]) -> ToolResult:
+        """Fan ``queries`` out concurrently and merge their results by URL."""
+        queries = [q for q in params.get("queries") or [] if q.strip()]
+        if not queries:
+            return ToolResult(success=False, error="No queries provided")
+        gate = asyncio.Semaphore(self._fanout_concurrency)
+        shared = {k: v for k, v in params.items() if k != "queries"}
+
+        async def run(query: str) -> ToolResult:
+            async with gate:
+                return await self.execute({**shared, "query": query})
+
+        results = await asyncio.gather(*(run(q) for q in queries))
+
+        merged: list[dict[str, Any]] = []
+        seen: dict[str, dict[str, Any]] = {}
+        for query, result in zip(queries, results):
+            for item in (result.output or {}).get("results", []) if result.success else []:
+                key = item.get("url", "").rstrip("/") or item.get("snippet", "")
+                if key in seen:
+                    seen[key]["queries"].append(query)
+                    continue
+                seen[key] = {**item, "queries": [query]}
+                merged.append(seen[key])
+
+        failed = [q for q, r in zip(queries, results) if not r.success]
+        return ToolResult(
+            success=not failed,
+            output={
+                "queries": [
+                    {
+                        "query": q,
+                        "success": r.success,
+                        "results": (r.output or {}).get("results", []),
+                        "error": r.error,
+                        "cache": r.metadata.get("cache"),
+                    }
+                    for q, r in zip(queries, results)
+                ],
+                "results": merged,
+            },
+            error=f"Queries {failed} failed" if failed else None,
+            metadata={"query_count": len(queries), "merged_count": len(merged)},
+        )
+
+    async def aclose(self) -> None:
+        """Release the backend's client or index if this tool created it."""
+        if self._owns_backend:
+            await self._backend.aclose()
+
+    def cache_stats(self) -> dict[str, Any]:
+        """Hit/miss counters for the result cache (empty when disabled)."""
+        return self._cache.stats() if self._cache is not None else {}
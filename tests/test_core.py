@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import sys
 from pathlib import Path
 
@@ -9,6 +10,8 @@ import pytest
 
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
+from agent.core import Agent
+from agent.executor import Executor
 from agent.models import (
     AgentState,
     AuditEntry,
@@ -19,6 +22,10 @@ from agent.models import (
     ActionRisk,
     ApprovalDecision,
 )
+from agent.plan_cache import PlanCache
+from agent.planner import Planner, StepStreamParser
+from agent.verifier import Verifier
+from safety.guardrails import Guardrails
 
 
 class TestToolResult:
@@ -94,3 +101,387 @@ class TestAgentState:
         s.audit_trail.append(entry)
         assert len(s.audit_trail) == 1
         assert s.audit_trail[0].tool_name == "filesystem"
+
+
+class _RecordingTool:
+    """Test double that records call order and peak concurrency."""
+
+    def __init__(self, delay: float = 0.05, fail: set[str] | None = None):
+        self.delay = delay
+        self.fail = fail or set()
+        self.calls: list[str] = []
+        self.active = 0
+        self.peak = 0
+
+    async def execute(self, params: dict) -> ToolResult:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            self.calls.append(params["name"])
+            if params["name"] in self.fail:
+                return ToolResult(success=False, error="boom")
+            return ToolResult(success=True, output=params["name"])
+        finally:
+            self.active -= 1
+
+
+def _step(name: str, depends_on: list[Step] | None = None) -> Step:
+    return Step(
+        description=name,
+        tool_name="rec",
+        tool_params={"name": name},
+        depends_on=[s.id for s in depends_on or []],
+        max_retries=0,
+    )
+
+
+class TestExecutorScheduling:
+    async def test_independent_steps_run_concurrently(self):
+        tool = _RecordingTool()
+        executor = Executor(tools={"rec": tool}, max_concurrency=3)
+        steps = [_step(f"s{i}") for i in range(6)]
+
+        results = await executor.execute_plan_steps(steps)
+
+        assert all(r.success for r in results)
+        assert [r.output for r in results] == [s.description for s in steps]
+        assert tool.peak == 3
+
+    async def test_dependencies_run_in_order(self):
+        tool = _RecordingTool(delay=0.01)
+        executor = Executor(tools={"rec": tool})
+        a = _step("a")
+        b = _step("b", [a])
+        c = _step("c", [b])
+
+        # Listed out of order on purpose: the DAG, not the list, decides.
+        await executor.execute_plan_steps([c, b, a])
+
+        assert tool.calls == ["a", "b", "c"]
+
+    async def test_failure_skips_only_transitive_dependents(self):
+        tool = _RecordingTool(delay=0.01, fail={"a"})
+        executor = Executor(tools={"rec": tool})
+        a = _step("a")
+        b = _step("b", [a])
+        c = _step("c", [b])
+        d = _step("d")
+
+        results = await executor.execute_plan_steps([a, b, c, d])
+
+        assert a.status == StepStatus.FAILED
+        assert b.status == StepStatus.SKIPPED
+        assert c.status == StepStatus.SKIPPED
+        assert d.status == StepStatus.SUCCESS
+        assert "unmet dependencies" in (results[2].error or "")
+
+    async def test_cycle_is_skipped(self):
+        executor = Executor(tools={"rec": _RecordingTool(delay=0)})
+        a = _step("a")
+        b = _step("b", [a])
+        a.depends_on = [b.id]
+
+        results = await executor.execute_plan_steps([a, b])
+
+        assert not any(r.success for r in results)
+        assert a.status == b.status == StepStatus.SKIPPED
+
+
+class TestExecutorBulkheads:
+    async def test_per_tool_limit_caps_only_that_tool(self):
+        slow = _RecordingTool(delay=0.05)
+        fast = _RecordingTool(delay=0.05)
+        executor = Executor(max_concurrency=10)
+        executor.register_tool("slow", slow, max_concurrency=1)
+        executor.register_tool("fast", fast)
+        steps = [_step(f"s{i}") for i in range(3)] + [_step(f"f{i}") for i in range(3)]
+        for s in steps[:3]:
+            s.tool_name = "slow"
+        for s in steps[3:]:
+            s.tool_name = "fast"
+
+        results = await executor.execute_plan_steps(steps)
+
+        assert all(r.success for r in results)
+        assert slow.peak == 1
+        assert fast.peak == 3
+        assert max(r.metadata["queue_wait_ms"] for r in results[:3]) > 0
+        assert "queue_wait_ms" not in results[3].metadata
+
+    async def test_full_queue_rejects(self):
+        tool = _RecordingTool(delay=0.05)
+        executor = Executor(max_concurrency=10)
+        executor.register_tool("rec", tool, max_concurrency=1, max_queue=1)
+        steps = [_step(f"s{i}") for i in range(3)]
+
+        results = await executor.execute_plan_steps(steps)
+
+        assert sum(r.success for r in results) == 2
+        assert "Bulkhead full" in next(r.error for r in results if not r.success)
+
+
+class _FixedPlanner(Planner):
+    def __init__(self, steps: list[Step]):
+        super().__init__(client=object())
+        self.steps = steps
+
+    async def create_plan(self, goal, context=None) -> Plan:
+        return Plan(goal=goal, steps=self.steps)
+
+
+class TestAgentConcurrentRun:
+    async def test_concurrent_run_audits_in_plan_order(self):
+        tool = _RecordingTool(fail={"c"})
+        steps = [_step("a"), _step("b"), _step("c"), _step("d")]
+        steps[3].depends_on = [steps[2].id]
+        agent = Agent(
+            planner=_FixedPlanner(steps),
+            verifier=Verifier(client=object()),
+            concurrent=True,
+        )
+        agent.register_tool("rec", tool)
+
+        state = await agent.run("goal")
+
+        assert [e.action for e in state.audit_trail] == ["a", "b", "c", "d"]
+        assert state.completed_steps == 2
+        assert state.failed_steps == 1
+        assert steps[3].status == StepStatus.SKIPPED
+        assert tool.peak >= 2
+
+
+class TestAgentRisk:
+    def test_batch_risk_is_riskiest_op(self):
+        agent = Agent(planner=Planner(client=object()), verifier=Verifier(client=object()))
+        reads = {"action": "batch", "ops": [{"action": "read"}, {"action": "list"}]}
+        writes = {"action": "batch", "ops": [{"action": "read"}, {"action": "write"}]}
+        assert agent._assess_risk("filesystem", reads) == ActionRisk.LOW
+        assert agent._assess_risk("filesystem", writes) == ActionRisk.MEDIUM
+
+    async def test_malformed_batch_fails_only_its_step(self, tmp_path):
+        from tools.filesystem_tool import FilesystemTool
+
+        steps = [
+            Step(
+                description="bad batch",
+                tool_name="filesystem",
+                tool_params={"action": "batch", "path": "", "ops": ["write x", None]},
+                max_retries=0,
+            ),
+            Step(
+                description="good",
+                tool_name="filesystem",
+                tool_params={"action": "write", "path": "ok.txt", "content": "x"},
+            ),
+        ]
+        agent = Agent(
+            planner=_FixedPlanner(steps),
+            executor=Executor(),
+            verifier=Verifier(client=object()),
+            guardrails=Guardrails(),
+        )
+        agent.register_tool("filesystem", FilesystemTool(sandbox_root=str(tmp_path)))
+        assert agent._assess_risk("filesystem", steps[0].tool_params) == ActionRisk.HIGH
+
+        state = await agent.run("goal")
+
+        assert state.audit_trail[0].result.success is False
+        assert "list of objects" in state.audit_trail[0].result.error
+        assert (tmp_path / "ok.txt").read_text() == "x"
+
+
+class TestPlannerParsing:
+    def test_depends_on_indices_map_to_step_ids(self):
+        planner = Planner(client=object())
+        steps = planner._parse_steps(
+            '[{"description": "a", "tool_name": "fs"},'
+            ' {"description": "b", "tool_name": "fs", "depends_on": [0, 5, "x"]}]'
+        )
+        assert steps[0].depends_on == []
+        assert steps[1].depends_on == [steps[0].id]
+
+
+class _FakeCompletions:
+    def __init__(self, content: str):
+        self.content = content
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        message = type("Message", (), {"content": self.content})()
+        choice = type("Choice", (), {"message": message})()
+        return type("Response", (), {"choices": [choice]})()
+
+
+def _fake_client(content: str):
+    completions = _FakeCompletions(content)
+    chat = type("Chat", (), {"completions": completions})()
+    return type("Client", (), {"chat": chat})(), completions
+
+
+PLAN_JSON = (
+    '[{"description": "a", "tool_name": "fs", "tool_params": {"action": "mkdir"}},'
+    ' {"description": "b", "tool_name": "fs", "depends_on": [0]}]'
+)
+
+
+class TestPlanCache:
+    async def test_repeat_goal_skips_llm_with_fresh_step_ids(self):
+        client, completions = _fake_client(PLAN_JSON)
+        planner = Planner(client=client, plan_cache=PlanCache())
+
+        first = await planner.create_plan("Build  the thing", {"b": 1, "a": 2})
+        second = await planner.create_plan("Build the thing", {"a": 2, "b": 1})
+
+        assert completions.calls == 1
+        assert [s.description for s in second.steps] == ["a", "b"]
+        assert {s.id for s in first.steps}.isdisjoint(s.id for s in second.steps)
+        assert second.steps[1].depends_on == [second.steps[0].id]
+        second.steps[0].tool_params["action"] = "changed"
+        third = await planner.create_plan("Build the thing", {"a": 2, "b": 1})
+        assert third.steps[0].tool_params == {"action": "mkdir"}
+
+    async def test_different_context_or_tools_miss(self):
+        client, completions = _fake_client(PLAN_JSON)
+        planner = Planner(client=client, plan_cache=PlanCache())
+        agent = Agent(planner=planner, verifier=Verifier(client=object()))
+
+        await planner.create_plan("goal", {"x": 1})
+        await planner.create_plan("goal", {"x": 2})
+        agent.register_tool("rec", _RecordingTool())
+        await planner.create_plan("goal", {"x": 1})
+        await planner.create_plan("goal", {"x": 1})
+        assert completions.calls == 3
+
+    async def test_persists_and_expires(self, tmp_path):
+        now = [1000.0]
+        client, completions = _fake_client(PLAN_JSON)
+        cache_dir = str(tmp_path / "plans")
+        await Planner(
+            client=client, plan_cache=PlanCache(cache_dir, ttl_seconds=60, clock=lambda: now[0])
+        ).create_plan("goal")
+
+        reloaded = PlanCache(cache_dir, ttl_seconds=60, clock=lambda: now[0])
+        planner = Planner(client=client, plan_cache=reloaded)
+        await planner.create_plan("goal")
+        assert completions.calls == 1
+        now[0] += 61
+        await planner.create_plan("goal")
+        assert completions.calls == 2
+        assert reloaded.stats()["hits"] == 1
+
+    async def test_size_bound_evicts_least_recently_used(self, tmp_path):
+        cache = PlanCache(str(tmp_path), max_entries=2)
+        steps = [Step(description="s", tool_name="fs")]
+        for key in ["k1", "k2", "k3"]:
+            await cache.put(key, steps)
+        assert len(list(tmp_path.glob("*.plan.json"))) == 2
+        assert cache.stats()["size"] == 2
+
+    async def test_leaves_other_json_in_a_shared_dir(self, tmp_path):
+        (tmp_path / "other.json").write_text("{}")
+        cache = PlanCache(str(tmp_path), max_entries=1)
+        steps = [Step(description="s", tool_name="fs")]
+        await cache.put("k1", steps)
+        await cache.put("k2", steps)
+        assert (tmp_path / "other.json").exists()
+        await cache.clear()
+        assert [p.name for p in tmp_path.iterdir()] == ["other.json"]
+
+
+def _chunk(text: str):
+    delta = type("Delta", (), {"content": text})()
+    choice = type("Choice", (), {"delta": delta})()
+    return type("Chunk", (), {"choices": [choice]})()
+
+
+class _FakeStream:
+    """Streams text in small pieces, optionally pausing until ``gate`` opens."""
+
+    def __init__(self, pieces: list[str], gate: asyncio.Event | None = None, pause_after: int = 0):
+        self.pieces = pieces
+        self.gate = gate
+        self.pause_after = pause_after
+        self.closed = False
+
+    async def __aiter__(self):
+        for i, piece in enumerate(self.pieces):
+            if self.gate is not None and i == self.pause_after:
+                await self.gate.wait()
+            yield _chunk(piece)
+
+    async def close(self):
+        self.closed = True
+
+
+class _StreamingCompletions:
+    def __init__(self, stream: _FakeStream):
+        self.stream = stream
+
+    async def create(self, **kwargs):
+        assert kwargs["stream"] is True
+        return self.stream
+
+
+def _streaming_planner(stream: _FakeStream) -> Planner:
+    chat = type("Chat", (), {"completions": _StreamingCompletions(stream)})()
+    return Planner(client=type("Client", (), {"chat": chat})())
+
+
+class _GateTool(_RecordingTool):
+    """Opens ``gate`` when a step runs, proving it ran mid-stream."""
+
+    def __init__(self, gate: asyncio.Event):
+        super().__init__()
+        self.gate = gate
+
+    async def execute(self, params):
+        self.gate.set()
+        return await super().execute(params)
+
+
+STREAMED_PLAN = (
+    '```json\n[{"description": "a", "tool_name": "rec", "tool_params": {"name": "a",'
+    ' "note": "} ] \\" {"}}, {"description": "b", "tool_name": "rec",'
+    ' "tool_params": {"name": "b"}, "depends_on": [0]}]\n```'
+)
+
+
+class TestStreamingPlan:
+    def test_parser_emits_objects_as_they_close(self):
+        parser = StepStreamParser()
+        emitted = [parser.feed(ch) for ch in STREAMED_PLAN]
+        items = [item for batch in emitted for item in batch]
+        assert [i["description"] for i in items] == ["a", "b"]
+        assert items[0]["tool_params"]["note"] == '} ] " {'
+        first_close = next(i for i, batch in enumerate(emitted) if batch)
+        assert first_close < STREAMED_PLAN.index('"b"')
+
+    async def test_stream_plan_yields_steps_with_dependencies(self):
+        stream = _FakeStream([STREAMED_PLAN[i:i + 7] for i in range(0, len(STREAMED_PLAN), 7)])
+        steps = [step async for step in _streaming_planner(stream).stream_plan("goal")]
+        assert [s.description for s in steps] == ["a", "b"]
+        assert steps[1].depends_on == [steps[0].id]
+        assert stream.closed
+
+    @pytest.mark.parametrize("concurrent", [False, True])
+    async def test_agent_starts_first_step_before_plan_finishes(self, concurrent):
+        gate = asyncio.Event()
+        split = STREAMED_PLAN.index(', {"description": "b"')
+        # The stream stalls after step a until step a has actually run.
+        stream = _FakeStream([STREAMED_PLAN[:split], STREAMED_PLAN[split:]], gate, pause_after=1)
+        tool = _GateTool(gate)
+        agent = Agent(
+            planner=_streaming_planner(stream),
+            verifier=Verifier(client=object()),
+            concurrent=concurrent,
+            streaming=True,
+        )
+        agent.register_tool("rec", tool)
+
+        state = await asyncio.wait_for(agent.run("goal"), timeout=5)
+
+        assert tool.calls == ["a", "b"]
+        assert [e.action for e in state.audit_trail] == ["a", "b"]
+        assert state.completed_steps == 2
@@ -52,6 +52,17 @@ class TestGuardrails:
         assert guardrails.is_sensitive("code_executor", {"code": "x"}) is True
         assert guardrails.is_sensitive("web_search", {"query": "x"}) is False
 
+    def test_batch_takes_strictest_op(self, guardrails):
+        reads = {"action": "batch", "ops": [{"action": "read"}, {"action": "read"}]}
+        assert guardrails.check_action("filesystem", reads) == ApprovalDecision.AUTO_APPROVE
+        mixed = {"action": "batch", "ops": [{"action": "write"}, {"action": "delete"}]}
+        assert guardrails.check_action("filesystem", mixed) == ApprovalDecision.REQUIRE_APPROVAL
+
+    @pytest.mark.parametrize("ops", [["read"], [None, {"action": "read"}], "read"])
+    def test_malformed_batch_requires_approval(self, guardrails, ops):
+        decision = guardrails.check_action("filesystem", {"action": "batch", "ops": ops})
+        assert decision == ApprovalDecision.REQUIRE_APPROVAL
+
     def test_add_policy(self, guardrails):
         guardrails.add_policy("custom_tool", "read", ApprovalDecision.AUTO_APPROVE)
         decision = guardrails.check_action("custom_tool", {"action": "read"})
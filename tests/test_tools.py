@@ -2,16 +2,26 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
+import os
 import sys
 from pathlib import Path
 
+import httpx
 import pytest
 
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 from agent.models import ToolResult
+from tools.cache import ResponseCache
 from tools.filesystem_tool import FilesystemTool
 from tools.code_executor_tool import CodeExecutorTool
+from tools.github_tool import GitHubTool
+from tools.rate_limit import RateLimiter, RateLimitExceeded
+from tools.sandbox_limits import ResourceLimits
+from tools.search_backends import LocalIndexBackend
+from tools.web_search_tool import WebSearchTool
 
 
 class TestFilesystemTool:
@@ -80,6 +90,471 @@ class TestFilesystemTool:
         result = await tool.execute({"action": "explode", "path": "x"})
         assert result.success is False
 
+    @pytest.mark.asyncio
+    async def test_io_runs_off_the_event_loop(self, tool, monkeypatch):
+        import threading
+
+        threads = []
+        original = tool._read
+
+        def spy(*args):
+            threads.append(threading.current_thread())
+            return original(*args)
+
+        monkeypatch.setattr(tool, "_read", spy)
+        await tool.execute({"action": "write", "path": "t.txt", "content": "x"})
+        await tool.execute({"action": "read", "path": "t.txt"})
+        assert threads and threads[0] is not threading.main_thread()
+        await tool.aclose()
+
+
+class TestFilesystemWrites:
+    @pytest.fixture
+    def tool(self, tmp_path):
+        return FilesystemTool(sandbox_root=str(tmp_path))
+
+    async def test_overwrite_is_atomic(self, tool, tmp_path, monkeypatch):
+        await tool.execute({"action": "write", "path": "a.txt", "content": "old"})
+
+        def fail(*args):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(os, "replace", fail)
+        result = await tool.execute({"action": "write", "path": "a.txt", "content": "new"})
+
+        assert result.success is False
+        assert (tmp_path / "a.txt").read_text() == "old"
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["a.txt"]
+
+    async def test_append(self, tool, tmp_path):
+        await tool.execute({"action": "write", "path": "log.txt", "content": "a"})
+        await tool.execute({"action": "write", "path": "log.txt", "content": "b", "mode": "append"})
+        assert (tmp_path / "log.txt").read_text() == "ab"
+
+    async def test_chunked_write_publishes_on_close(self, tool, tmp_path):
+        opened = await tool.execute({"action": "write_open", "path": "out/big.txt"})
+        handle = opened.output["handle"]
+        for chunk in ("one ", "two ", "three"):
+            result = await tool.execute(
+                {"action": "write", "path": "out/big.txt", "handle": handle, "content": chunk}
+            )
+            assert result.success is True
+            assert not (tmp_path / "out" / "big.txt").exists()
+
+        closed = await tool.execute({"action": "write_close", "path": "out/big.txt", "handle": handle})
+
+        assert closed.output["size"] == 13
+        assert (tmp_path / "out" / "big.txt").read_text() == "one two three"
+        assert [p.name for p in (tmp_path / "out").iterdir()] == ["big.txt"]
+
+    async def test_published_file_modes(self, tool, tmp_path):
+        umask = os.umask(0o022)
+        try:
+            tool = FilesystemTool(sandbox_root=str(tmp_path))
+        finally:
+            os.umask(umask)
+        await tool.execute({"action": "write", "path": "new.txt", "content": "x"})
+        assert (tmp_path / "new.txt").stat().st_mode & 0o777 == 0o644
+
+        (tmp_path / "run.sh").write_text("old")
+        (tmp_path / "run.sh").chmod(0o750)
+        await tool.execute({"action": "write", "path": "run.sh", "content": "new"})
+        assert (tmp_path / "run.sh").stat().st_mode & 0o777 == 0o750
+
+    async def test_staging_files_are_not_listed(self, tool, tmp_path):
+        (tmp_path / "a.txt").write_text("needle")
+        opened = await tool.execute({"action": "write_open", "path": "a.txt"})
+        await tool.execute({
+            "action": "write", "path": "a.txt", "handle": opened.output["handle"],
+            "content": "needle",
+        })
+        assert len(list(tmp_path.iterdir())) == 2
+
+        listed = await tool.execute({"action": "list", "path": "."})
+        assert [e["name"] for e in listed.output] == ["a.txt"]
+        walked = await tool.execute({"action": "walk", "path": "."})
+        assert [e["path"] for e in walked.output["entries"]] == ["a.txt"]
+        globbed = await tool.execute({"action": "glob", "path": ".", "pattern": "*"})
+        assert [e["path"] for e in globbed.output["entries"]] == ["a.txt"]
+        found = await tool.execute({"action": "search", "path": ".", "query": "needle"})
+        assert [m["path"] for m in found.output["matches"]] == ["a.txt"]
+
+    async def test_discard_and_unknown_handle(self, tool, tmp_path):
+        opened = await tool.execute({"action": "write_open", "path": "x.txt"})
+        handle = opened.output["handle"]
+        await tool.execute({"action": "write_close", "path": "x.txt", "handle": handle, "discard": True})
+        assert list(tmp_path.iterdir()) == []
+
+        result = await tool.execute({"action": "write", "path": "x.txt", "handle": handle, "content": "z"})
+        assert result.success is False
+
+
+class TestFilesystemWalk:
+    @pytest.fixture
+    def tool(self, tmp_path):
+        for rel in ["a/x.py", "a/y.txt", "a/deep/z.py", "b/w.py", "node_modules/m.py", "top.py"]:
+            (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / rel).write_text(rel)
+        return FilesystemTool(sandbox_root=str(tmp_path))
+
+    async def test_recursive_walk_in_order(self, tool):
+        result = await tool.execute({"action": "walk", "path": ".", "exclude": ["node_modules"]})
+        paths = [e["path"] for e in result.output["entries"]]
+        assert paths == ["a", "a/deep", "a/deep/z.py", "a/x.py", "a/y.txt", "b", "b/w.py", "top.py"]
+        assert result.output["cursor"] is None
+
+    async def test_glob_with_depth_and_type(self, tool):
+        result = await tool.execute(
+            {"action": "glob", "path": ".", "pattern": "*.py", "max_depth": 2, "type": "file"}
+        )
+        paths = [e["path"] for e in result.output["entries"]]
+        assert paths == ["a/x.py", "b/w.py", "node_modules/m.py", "top.py"]
+
+    async def test_pagination_resumes_after_cursor(self, tool):
+        params = {"action": "walk", "path": ".", "limit": 3}
+        seen = []
+        while True:
+            result = await tool.execute(params)
+            seen += [e["path"] for e in result.output["entries"]]
+            if not result.output["cursor"]:
+                break
+            params = {**params, "cursor": result.output["cursor"]}
+        full = await tool.execute({"action": "walk", "path": "."})
+        assert seen == [e["path"] for e in full.output["entries"]]
+        assert len(seen) == 10
+
+
+class TestFilesystemSearch:
+    @pytest.fixture
+    def tool(self, tmp_path):
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "a.py").write_text("import os\n\ndef main():\n    return TODO\n")
+        (tmp_path / "src" / "b.py").write_text("x = 1\n# todo: tidy\ny = 2\n")
+        (tmp_path / "blob.bin").write_bytes(b"TODO\0\x01\x02")
+        return FilesystemTool(sandbox_root=str(tmp_path))
+
+    async def test_literal_with_context(self, tool):
+        result = await tool.execute(
+            {"action": "search", "path": ".", "query": "TODO", "context": 1}
+        )
+        assert result.success
+        [match] = result.output["matches"]
+        assert match == {
+            "path": "src/a.py", "line": 4, "text": "    return TODO",
+            "before": ["def main():"], "after": [],
+        }
+        assert result.output["binary_skipped"] == 1
+        assert not result.output["truncated"]
+
+    async def test_regex_ignore_case_and_include(self, tool):
+        result = await tool.execute({
+            "action": "search", "path": ".", "query": r"to+do", "regex": True,
+            "ignore_case": True, "include": ["*.py"], "context": 1,
+        })
+        found = [(m["path"], m["line"]) for m in result.output["matches"]]
+        assert found == [("src/a.py", 4), ("src/b.py", 2)]
+        assert result.output["matches"][1]["after"] == ["y = 2"]
+
+    async def test_stops_at_max_matches(self, tool, tmp_path):
+        (tmp_path / "many.txt").write_text("hit\n" * 50)
+        result = await tool.execute(
+            {"action": "search", "path": "many.txt", "query": "hit", "max_matches": 5}
+        )
+        assert [m["line"] for m in result.output["matches"]] == [1, 2, 3, 4, 5]
+        assert result.output["truncated"]
+
+    async def test_exact_budget_is_not_truncated(self, tool, tmp_path):
+        (tmp_path / "few.txt").write_text("hit\nhit\nmiss\nmiss\n")
+        result = await tool.execute(
+            {"action": "search", "path": "few.txt", "query": "hit", "max_matches": 2}
+        )
+        assert [m["line"] for m in result.output["matches"]] == [1, 2]
+        assert result.output["files_scanned"] == 1
+        assert not result.output["truncated"]
+
+    async def test_files_skipped_after_truncation_are_not_scanned(self, tmp_path):
+        (tmp_path / "a.txt").write_text("hit\nhit\n")
+        (tmp_path / "b.txt").write_text("hit\n")
+        tool = FilesystemTool(sandbox_root=str(tmp_path), io_workers=1)
+        result = await tool.execute(
+            {"action": "search", "path": ".", "query": "hit", "max_matches": 1}
+        )
+        assert [(m["path"], m["line"]) for m in result.output["matches"]] == [("a.txt", 1)]
+        assert result.output["truncated"]
+        assert result.output["files_scanned"] == 1
+
+    async def test_missing_path(self, tool):
+        result = await tool.execute({"action": "search", "path": "nope", "query": "x"})
+        assert not result.success
+        assert "Path not found" in result.error
+
+    async def test_invalid_regex(self, tool):
+        result = await tool.execute({"action": "search", "path": ".", "query": "(", "regex": True})
+        assert not result.success
+        assert "Invalid pattern" in result.error
+
+
+class TestFilesystemBatch:
+    @pytest.fixture
+    def tool(self, tmp_path):
+        return FilesystemTool(sandbox_root=str(tmp_path))
+
+    async def test_scaffold_in_one_call(self, tool, tmp_path):
+        result = await tool.execute({
+            "action": "batch",
+            "path": "proj",
+            "ops": [
+                {"action": "mkdir", "path": "."},
+                {"action": "write", "path": "a.py", "content": "A"},
+                {"action": "write", "path": "b.py", "content": "B"},
+                {"action": "read", "path": "a.py"},
+            ],
+        })
+        assert result.success
+        results = result.output["results"]
+        assert [r["path"] for r in results] == ["proj", "proj/a.py", "proj/b.py", "proj/a.py"]
+        assert results[3]["output"]["content"] == "A"
+        assert (tmp_path / "proj" / "b.py").read_text() == "B"
+
+    async def test_overlapping_ops_keep_order(self, tool, tmp_path):
+        ops = [{"action": "write", "path": "f.txt", "content": str(i)} for i in range(10)]
+        ops.append({"action": "delete", "path": "f.txt"})
+        ops.append({"action": "write", "path": "f.txt", "content": "last"})
+        result = await tool.execute({"action": "batch", "path": "", "ops": ops})
+        assert result.success
+        assert (tmp_path / "f.txt").read_text() == "last"
+
+    async def test_reports_failed_ops(self, tool):
+        result = await tool.execute({
+            "action": "batch",
+            "path": "",
+            "ops": [
+                {"action": "read", "path": "missing.txt"},
+                {"action": "write", "path": "ok.txt", "content": "x"},
+                {"action": "write", "path": "../escape.txt", "content": "x"},
+            ],
+        })
+        assert not result.success
+        assert result.error == "2 of 3 batch ops failed"
+        assert [r["success"] for r in result.output["results"]] == [False, True, False]
+
+    async def test_rejects_unsupported_ops(self, tool):
+        result = await tool.execute(
+            {"action": "batch", "path": "", "ops": [{"action": "batch", "path": ""}]}
+        )
+        assert not result.success
+        assert "Unsupported batch action" in result.error
+
+
+class TestFilesystemSnapshots:
+    @pytest.fixture
+    def tool(self, tmp_path):
+        tool = FilesystemTool(
+            sandbox_root=str(tmp_path / "ws"), snapshot_dir=str(tmp_path / "snaps")
+        )
+        for rel in ["keep.txt", "edit.txt", "log.txt", "gone.txt", "sub/inner.txt"]:
+            (tmp_path / "ws" / rel).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / "ws" / rel).write_text(f"orig {rel}")
+        return tool
+
+    async def test_restore_rolls_back_only_changes(self, tool, tmp_path):
+        snap = await tool.execute({"action": "snapshot", "path": "", "snapshot": "base"})
+        assert snap.success and snap.output["files"] == 5
+        assert (tmp_path / "snaps" / "base" / "files" / "sub" / "inner.txt").exists()
+
+        await tool.execute({"action": "write", "path": "edit.txt", "content": "changed"})
+        await tool.execute({"action": "write", "path": "log.txt", "content": "+", "mode": "append"})
+        await tool.execute({"action": "delete", "path": "gone.txt"})
+        await tool.execute({"action": "write", "path": "new/extra.txt", "content": "x"})
+
+        restored = await tool.execute({"action": "restore", "path": "", "snapshot": "base"})
+        assert restored.output == {
+            "snapshot": "base", "restored": 3, "removed": 1, "unchanged": 2,
+        }
+        ws = tmp_path / "ws"
+        assert sorted(p.relative_to(ws).as_posix() for p in ws.rglob("*")) == [
+            "edit.txt", "gone.txt", "keep.txt", "log.txt", "sub", "sub/inner.txt",
+        ]
+        for rel in ["edit.txt", "log.txt", "gone.txt"]:
+            assert (ws / rel).read_text() == f"orig {rel}"
+
+        again = await tool.execute({"action": "restore", "path": "", "snapshot": "base"})
+        assert again.output["restored"] == 0 and again.output["unchanged"] == 5
+
+    async def test_append_does_not_leak_into_snapshot(self, tool, tmp_path):
+        await tool.execute({"action": "snapshot", "path": "", "snapshot": "s"})
+        await tool.execute({"action": "write", "path": "log.txt", "content": "+", "mode": "append"})
+        assert (tmp_path / "snaps" / "s" / "files" / "log.txt").read_text() == "orig log.txt"
+        assert (tmp_path / "ws" / "log.txt").read_text() == "orig log.txt+"
+
+    async def test_open_append_handle_does_not_leak_into_snapshot(self, tool, tmp_path):
+        opened = await tool.execute({"action": "write_open", "path": "log.txt", "mode": "append"})
+        handle = opened.output["handle"]
+        await tool.execute({"action": "snapshot", "path": "", "snapshot": "s"})
+        await tool.execute({"action": "write", "path": "log.txt", "handle": handle, "content": "+"})
+        await tool.execute({"action": "write_close", "path": "log.txt", "handle": handle})
+        assert (tmp_path / "snaps" / "s" / "files" / "log.txt").read_text() == "orig log.txt"
+
+        await tool.execute({"action": "restore", "path": "", "snapshot": "s"})
+        assert (tmp_path / "ws" / "log.txt").read_text() == "orig log.txt"
+
+    async def test_staging_files_are_not_snapshotted(self, tool, tmp_path):
+        opened = await tool.execute({"action": "write_open", "path": "big.txt"})
+        handle = opened.output["handle"]
+        snap = await tool.execute({"action": "snapshot", "path": "", "snapshot": "s"})
+        assert snap.output["files"] == 5
+        assert not list((tmp_path / "snaps" / "s" / "files").glob(".big.txt.*"))
+
+        await tool.execute({"action": "write_close", "path": "big.txt", "handle": handle})
+        restored = await tool.execute({"action": "restore", "path": "", "snapshot": "s"})
+        assert restored.output["removed"] == 1
+        assert not list((tmp_path / "ws").glob(".big.txt.*"))
+        assert not (tmp_path / "ws" / "big.txt").exists()
+
+        reopened = await tool.execute({"action": "write_open", "path": "big.txt"})
+        await tool.execute({"action": "restore", "path": "", "snapshot": "s"})
+        closed = await tool.execute(
+            {"action": "write_close", "path": "big.txt", "handle": reopened.output["handle"]}
+        )
+        assert closed.success
+
+    async def test_snapshot_without_fcntl(self, tool, tmp_path, monkeypatch):
+        import tools.filesystem_tool as fs
+
+        monkeypatch.setattr(fs, "fcntl", None)
+        snap = await tool.execute({"action": "snapshot", "path": "", "snapshot": "s"})
+        assert snap.success and "reflink" not in snap.output["methods"]
+
+    @pytest.mark.parametrize("store", ["ws.snapshots", None])
+    async def test_snapshot_store_unreachable_from_sandbox(self, tmp_path, store):
+        tool = FilesystemTool(
+            sandbox_root=str(tmp_path / "ws"),
+            snapshot_dir=str(tmp_path / store) if store else None,
+        )
+        (tmp_path / "ws" / "a.txt").write_text("orig")
+        await tool.execute({"action": "snapshot", "path": "", "snapshot": "base"})
+        rel = f"../{store or '.ws.snapshots'}"
+        assert (tmp_path / rel.removeprefix("../") / "base" / "files" / "a.txt").exists()
+
+        write = await tool.execute(
+            {"action": "write", "path": f"{rel}/base/files/a.txt", "content": "EVIL"}
+        )
+        delete = await tool.execute({"action": "delete", "path": rel})
+        assert not write.success and not delete.success
+
+        await tool.execute({"action": "write", "path": "a.txt", "content": "changed"})
+        restored = await tool.execute({"action": "restore", "path": rel, "snapshot": "base"})
+        assert restored.success is False
+        await tool.execute({"action": "restore", "path": "", "snapshot": "base"})
+        assert (tmp_path / "ws" / "a.txt").read_text() == "orig"
+
+    def test_snapshot_dir_inside_sandbox_rejected(self, tmp_path):
+        with pytest.raises(ValueError):
+            FilesystemTool(sandbox_root=str(tmp_path), snapshot_dir=str(tmp_path / "snaps"))
+
+    async def test_unknown_and_dropped_snapshots(self, tool):
+        assert not (await tool.execute({"action": "restore", "path": "", "snapshot": "nope"})).success
+        assert not (await tool.execute({"action": "snapshot", "path": "", "snapshot": "../x"})).success
+        await tool.execute({"action": "snapshot", "path": "", "snapshot": "s"})
+        assert (await tool.execute({"action": "snapshot_drop", "path": "", "snapshot": "s"})).success
+        assert not (await tool.execute({"action": "restore", "path": "", "snapshot": "s"})).success
+
+    @pytest.mark.parametrize("snapshot_id", ["..", ".", "...", ""])
+    async def test_dot_ids_cannot_reach_outside_the_store(self, tool, tmp_path, snapshot_id):
+        (tmp_path / "sibling.txt").write_text("keep")
+        await tool.execute({"action": "snapshot", "path": "", "snapshot": "base"})
+        for action in ("snapshot_drop", "restore"):
+            result = await tool.execute({"action": action, "path": "", "snapshot": snapshot_id})
+            assert not result.success
+        if snapshot_id:
+            result = await tool.execute({"action": "snapshot", "path": "", "snapshot": snapshot_id})
+            assert not result.success
+        assert (tmp_path / "sibling.txt").read_text() == "keep"
+        assert (tmp_path / "ws" / "keep.txt").exists()
+        assert (tmp_path / "snaps" / "base" / "manifest.json").exists()
+
+
+class TestFilesystemRangedRead:
+    @pytest.fixture(params=[1 << 30, 0], ids=["buffered", "mmap"])
+    def tool(self, tmp_path, request):
+        tool = FilesystemTool(sandbox_root=str(tmp_path), mmap_threshold=request.param)
+        lines = "".join(f"line {i}\n" for i in range(1, 101))
+        (tmp_path / "log.txt").write_text(lines)
+        return tool
+
+    async def test_byte_window(self, tool):
+        result = await tool.execute({"action": "read", "path": "log.txt", "offset": 7, "length": 7})
+        assert result.output["content"] == "line 2\n"
+        assert result.output["next_offset"] == 14
+        assert result.output["eof"] is False
+
+    async def test_page_through_with_cursor(self, tool):
+        params = {"action": "read", "path": "log.txt", "max_lines": 30}
+        pages = []
+        while True:
+            result = await tool.execute(params)
+            pages.append(result.output)
+            if result.output["eof"]:
+                break
+            params = {"action": "read", "path": "log.txt", "max_lines": 30,
+                      "cursor": result.output["cursor"]}
+
+        assert [p["start_line"] for p in pages] == [1, 31, 61, 91]
+        assert pages[1]["content"].splitlines()[0] == "line 31"
+        assert "".join(p["content"] for p in pages).count("\n") == 100
+
+    async def test_line_window_respects_max_bytes(self, tool):
+        result = await tool.execute(
+            {"action": "read", "path": "log.txt", "max_lines": 10, "max_bytes": 10}
+        )
+        assert result.output["content"] == "line 1\nlin"
+        assert result.output["next_offset"] == 10
+
+    async def test_line_range(self, tool):
+        result = await tool.execute(
+            {"action": "read", "path": "log.txt", "start_line": 10, "end_line": 12}
+        )
+        assert result.output["content"] == "line 10\nline 11\nline 12\n"
+        assert result.output["end_line"] == 12
+
+    async def test_window_does_not_split_characters(self, tool, tmp_path):
+        (tmp_path / "u.txt").write_text("aé" * 10, encoding="utf-8")
+        result = await tool.execute({"action": "read", "path": "u.txt", "max_bytes": 2})
+        assert result.output["content"] == "a"
+        assert result.output["next_offset"] == 1
+
+    @pytest.mark.parametrize("bad", [
+        {"length": -1}, {"length": 0}, {"max_bytes": -5}, {"max_bytes": 0},
+        {"max_lines": 0}, {"offset": -1},
+    ])
+    async def test_rejects_non_positive_windows(self, tool, bad):
+        result = await tool.execute({"action": "read", "path": "log.txt", **bad})
+        assert result.success is False
+        assert result.output is None
+
+    @pytest.mark.parametrize("window", [{"max_bytes": 1}, {"max_bytes": 1, "max_lines": 1}])
+    async def test_tiny_windows_still_advance_whole_characters(self, tool, tmp_path, window):
+        text = "aé€😀\nb"
+        (tmp_path / "u.txt").write_text(text, encoding="utf-8")
+        params = {"action": "read", "path": "u.txt", **window}
+        pieces = []
+        for _ in range(20):
+            result = await tool.execute(params)
+            pieces.append(result.output["content"])
+            if result.output["eof"]:
+                break
+            params = {**params, "cursor": result.output["cursor"]}
+        assert "".join(pieces) == text
+        assert "\ufffd" not in "".join(pieces)
+
+    async def test_cursor_is_bound_to_file(self, tool, tmp_path):
+        (tmp_path / "other.txt").write_text("x")
+        first = await tool.execute({"action": "read", "path": "log.txt", "max_bytes": 5})
+        result = await tool.execute(
+            {"action": "read", "path": "other.txt", "cursor": first.output["cursor"]}
+        )
+        assert result.success is False
+
 
 class TestCodeExecutorTool:
     @pytest.fixture
@@ -117,3 +592,594 @@ class TestCodeExecutorTool:
         })
         assert result.success is False
         assert "timeout" in (result.error or "").lower()
+
+    @pytest.mark.asyncio
+    async def test_code_transports_match(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+        code = "import sys; print('out'); print('err', file=sys.stderr); sys.exit(2)"
+        via_stdin = await CodeExecutorTool(code_transport="stdin").execute({"code": code})
+        via_file = await CodeExecutorTool(code_transport="file").execute({"code": code})
+        assert via_stdin.output == via_file.output
+        assert via_stdin.output["returncode"] == 2
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_output_is_capped_and_drained(self):
+        tool = CodeExecutorTool(max_output_chars=100)
+        result = await tool.execute({"code": "import sys; sys.stdout.write('x' * 5_000_000)"})
+        assert result.success is True
+        assert len(result.output["stdout"]) == 100
+        assert result.metadata["truncated"] is True
+        assert result.metadata["output_bytes"]["stdout"] == 5_000_000
+
+    @pytest.mark.asyncio
+    async def test_output_overflow_can_kill(self):
+        tool = CodeExecutorTool(max_output_bytes=1000, kill_on_output_overflow=True)
+        result = await tool.execute({"code": "while True: print('spam')"})
+        assert result.success is False
+        assert "exceeded" in result.error
+
+    @pytest.mark.asyncio
+    async def test_streams_lines_to_callback(self):
+        lines = []
+        tool = CodeExecutorTool(on_output=lambda stream, line: lines.append((stream, line)))
+        code = "import sys; print('a'); print('b', file=sys.stderr); print('c', end='')"
+        result = await tool.execute({"code": code})
+        assert result.metadata["truncated"] is False
+        assert sorted(lines) == [("stderr", "b"), ("stdout", "a"), ("stdout", "c")]
+
+
+class TestCodeExecutorCache:
+    @pytest.fixture
+    def tool(self):
+        return CodeExecutorTool(cache_size=8)
+
+    async def test_repeat_run_is_served_from_cache(self, tool):
+        code = "import random; print(random.random())"
+        first = await tool.execute({"code": code})
+        second = await tool.execute({"code": code})
+        assert first.metadata["cache"] == "miss"
+        assert second.metadata["cache"] == "hit"
+        assert second.output == first.output
+        assert tool.cache_stats()["hit_rate"] == 0.5
+
+    async def test_cache_can_be_bypassed(self, tool):
+        code = "import random; print(random.random())"
+        first = await tool.execute({"code": code})
+        second = await tool.execute({"code": code, "cache": False})
+        assert "cache" not in second.metadata
+        assert second.output != first.output
+
+    async def test_failures_are_not_cached(self, tool):
+        await tool.execute({"code": "raise ValueError('x')"})
+        result = await tool.execute({"code": "raise ValueError('x')"})
+        assert result.metadata["cache"] == "miss"
+
+
+class TestCodeExecutorLimits:
+    @pytest.fixture(params=[0, 1], ids=["subprocess", "pooled"])
+    async def tool(self, request):
+        limits = ResourceLimits(cpu_seconds=1, memory_bytes=512 * 2**20, open_files=32)
+        tool = CodeExecutorTool(timeout_seconds=10, pool_size=request.param, limits=limits)
+        yield tool
+        await tool.aclose()
+
+    async def test_cpu_limit(self, tool):
+        result = await tool.execute({"code": "while True: pass"})
+        assert result.success is False
+        assert result.metadata["limit_exceeded"] == "cpu"
+        assert result.metadata["limits"]["cpu_seconds"] == 1
+
+    async def test_memory_limit(self, tool):
+        result = await tool.execute({"code": "x = bytearray(2 * 1024 ** 3)"})
+        assert result.metadata["limit_exceeded"] == "memory"
+
+    async def test_open_files_limit(self, tool):
+        result = await tool.execute({"code": "fs = [open('/dev/null') for _ in range(100)]"})
+        assert result.metadata["limit_exceeded"] == "open_files"
+
+    async def test_normal_run_unaffected(self, tool):
+        result = await tool.execute({"code": "print(sum(range(10)))"})
+        assert result.success is True
+        assert "limit_exceeded" not in result.metadata
+
+    async def test_limits_reach_the_code(self, tool):
+        result = await tool.execute(
+            {"code": "import resource; print(resource.getrlimit(resource.RLIMIT_NOFILE))"}
+        )
+        assert result.output["stdout"] == "(32, 32)\n"
+
+    def test_nproc_rlimit_is_opt_in(self):
+        # RLIMIT_NPROC counts the whole UID, so processes alone means pids.max.
+        assert ResourceLimits(processes=8).rlimits() == {}
+        assert ResourceLimits(processes=8, nproc_rlimit=True).rlimits() == {
+            "RLIMIT_NPROC": (8, 8)
+        }
+        assert ResourceLimits(processes=8).worker_args() == []
+
+
+class TestCodeExecutorPool:
+    @pytest.fixture
+    async def tool(self):
+        tool = CodeExecutorTool(timeout_seconds=5, pool_size=1, max_runs_per_worker=3)
+        await tool.start()
+        yield tool
+        await tool.aclose()
+
+    async def test_pooled_execution(self, tool):
+        result = await tool.execute({"code": "print('hello')"})
+        assert result.success is True
+        assert result.output == {"stdout": "hello\n", "stderr": "", "returncode": 0}
+        assert result.metadata["pooled"] is True
+
+    async def test_fresh_namespace_and_errors(self, tool):
+        await tool.execute({"code": "x = 1"})
+        result = await tool.execute({"code": "print(x)"})
+        assert result.success is False
+        assert "NameError" in result.error
+
+        result = await tool.execute({"code": "import sys; sys.exit(3)"})
+        assert result.output["returncode"] == 3
+
+    async def test_state_leak_recycles_worker(self, tool):
+        await tool.execute({"code": "import os; print(os.getpid())"})
+        first = (await tool.execute({"code": "import os; print(os.getpid())"})).output["stdout"]
+        await tool.execute({"code": "import os; os.environ['LEAK'] = '1'"})
+        result = await tool.execute({"code": "import os; print(os.getpid(), 'LEAK' in os.environ)"})
+        pid, leaked = result.output["stdout"].split()
+        assert pid != first.strip()
+        assert leaked == "False"
+
+    async def test_stdlib_monkeypatch_recycles_worker(self, tool):
+        await tool.execute({"code": "import math; math.pi = 3"})
+        result = await tool.execute({"code": "import math; print(math.pi)"})
+        assert result.output["stdout"] == "3.141592653589793\n"
+
+        await tool.execute({"code": "import builtins; builtins.len = lambda x: 0"})
+        result = await tool.execute({"code": "print(len('abc'))"})
+        assert result.output["stdout"] == "3\n"
+
+    async def test_broken_protocol_fails_the_run_only(self, tool):
+        result = await tool.execute(
+            {"code": "import json; json.dumps = lambda *a, **k: 'x'; print('ok')"}
+        )
+        assert result.output["stdout"] == "ok\n"
+
+        result = await tool.execute({"code": (
+            "import json.encoder as e\n"
+            "e.c_make_encoder = None\n"
+            "e.encode_basestring = lambda s: 'x'\n"
+        )})
+        assert result.success is False
+        assert "invalid response" in result.error
+
+        result = await tool.execute({"code": "print('still works')"})
+        assert result.output["stdout"] == "still works\n"
+
+    async def test_timeout_kills_worker(self, tool):
+        result = await tool.execute({"code": "while True: pass", "timeout_seconds": 1})
+        assert result.success is False
+        assert result.metadata["timeout"] is True
+
+        result = await tool.execute({"code": "print('still works')"})
+        assert result.success is True
+
+
+class TestCodeExecutorBatch:
+    @pytest.fixture(params=[0, 1], ids=["ephemeral", "pooled"])
+    async def tool(self, request):
+        tool = CodeExecutorTool(timeout_seconds=5, pool_size=request.param)
+        yield tool
+        await tool.aclose()
+
+    async def test_batch_runs_isolated_snippets(self, tool):
+        result = await tool.execute({
+            "snippets": [
+                "import os; x = 1; print(os.getpid())",
+                {"code": "import os; print(os.getpid(), 'x' in globals())"},
+                "raise SystemExit(4)",
+            ],
+        })
+        first, second, third = result.output["results"]
+        pid, leaked = second["stdout"].split()
+        assert first["stdout"].strip() == pid
+        assert leaked == "False"
+        assert third["returncode"] == 4 and third["success"] is False
+        assert result.success is False
+        assert result.metadata["batch_size"] == 3
+
+    async def test_batch_timeout_is_per_snippet(self, tool):
+        result = await tool.execute({
+            "snippets": [
+                {"code": "while True: pass", "timeout_seconds": 1},
+                "print('after')",
+            ],
+        })
+        timed_out, after = result.output["results"]
+        assert timed_out["timeout"] is True
+        assert after["stdout"] == "after\n"
+
+    async def test_empty_batch(self, tool):
+        result = await tool.execute({"snippets": []})
+        assert result.success is False
+
+    @pytest.mark.parametrize("pool_size", [0, 1], ids=["ephemeral", "pooled"])
+    async def test_batch_honours_output_settings(self, pool_size):
+        lines = []
+        tool = CodeExecutorTool(
+            pool_size=pool_size,
+            max_output_bytes=8,
+            kill_on_output_overflow=True,
+            on_output=lambda stream, line: lines.append((stream, line)),
+            limits=ResourceLimits(open_files=32),
+        )
+        try:
+            result = await tool.execute({"snippets": [
+                "print('hi')",
+                "print('x' * 100)",
+                "import resource; print(resource.getrlimit(resource.RLIMIT_NOFILE)[0])",
+            ]})
+        finally:
+            await tool.aclose()
+        small, big, limited = result.output["results"]
+        assert small["success"] is True
+        assert big["success"] is False and big["truncated"] is True
+        assert "Output exceeded 8 bytes" in big["error"]
+        assert limited["stdout"] == "32\n"
+        assert ("stdout", "hi") in lines
+
+
+class TestGitHubTool:
+    @pytest.fixture
+    def requests(self):
+        return []
+
+    @pytest.fixture
+    def tool(self, requests):
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json=[{"name": "demo", "html_url": "https://x/demo"}])
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return GitHubTool(token="t0ken", client=client)
+
+    async def test_reuses_one_client(self, tool, requests):
+        await tool.execute({"action": "list_repos"})
+        client = tool._client
+        result = await tool.execute({"action": "list_repos"})
+
+        assert result.success is True
+        assert result.output == [{"name": "demo", "url": "https://x/demo"}]
+        assert tool._client is client
+        assert all(r.headers["Authorization"] == "token t0ken" for r in requests)
+
+    async def test_aclose_only_closes_owned_client(self, tool):
+        await tool.aclose()
+        assert tool._client is not None and not tool._client.is_closed
+
+        owned = GitHubTool(token="t")
+        client = owned._get_client()
+        async with owned:
+            pass
+        assert client.is_closed
+        assert owned._client is None
+
+    async def test_conditional_requests_served_from_cache(self, tmp_path):
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(
+                200,
+                json={"content": "aGVsbG8=", "sha": "abc"},
+                headers={"ETag": '"v1"'},
+            )
+
+        def make_tool():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            return GitHubTool(token="t", client=client, cache_dir=str(tmp_path))
+
+        params = {"action": "read_file", "owner": "o", "repo": "r", "path": "a.txt"}
+        first = await make_tool().execute(params)
+        second = await make_tool().execute(params)
+
+        assert first.metadata["cache"] == "miss"
+        assert second.metadata["cache"] == "hit"
+        assert second.output == {"content": "hello", "sha": "abc"}
+        assert seen == [None, '"v1"']
+
+    async def test_retries_after_secondary_rate_limit(self):
+        responses = [
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            httpx.Response(
+                200,
+                json=[],
+                headers={
+                    "X-RateLimit-Limit": "5000",
+                    "X-RateLimit-Remaining": "4999",
+                    "X-RateLimit-Reset": "9999999999",
+                },
+            ),
+        ]
+        client = httpx.AsyncClient(transport=httpx.MockTransport(lambda r: responses.pop(0)))
+        tool = GitHubTool(token="t", client=client)
+
+        result = await tool.execute({"action": "list_repos"})
+
+        assert result.success is True
+        assert result.metadata["rate_limit"]["remaining"] == 4999
+        assert result.metadata["rate_limit"]["throttled_responses"] == 1
+
+    async def test_commit_files_makes_one_commit(self):
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            path = request.url.path.removeprefix("/repos/o/r")
+            calls.append((request.method, path))
+            if path == "/git/ref/heads/main":
+                return httpx.Response(200, json={"object": {"sha": "head"}})
+            if path == "/git/commits/head":
+                return httpx.Response(200, json={"tree": {"sha": "base-tree"}})
+            if path == "/git/blobs":
+                return httpx.Response(201, json={"sha": f"blob-{len(calls)}"})
+            if path == "/git/trees":
+                assert json.loads(request.content)["base_tree"] == "base-tree"
+                return httpx.Response(201, json={"sha": "tree"})
+            if path == "/git/commits":
+                assert json.loads(request.content)["parents"] == ["head"]
+                return httpx.Response(201, json={"sha": "new"})
+            if path == "/git/refs/heads/main":
+                return httpx.Response(200, json={})
+            return httpx.Response(404)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        tool = GitHubTool(token="t", client=client)
+        files = [{"path": f"pkg/m{i}.py", "content": f"x = {i}"} for i in range(5)]
+
+        result = await tool.execute({
+            "action": "commit_files", "owner": "o", "repo": "r", "branch": "main", "files": files,
+        })
+
+        assert result.success is True
+        assert result.output["commit"] == "new"
+        assert sum(1 for m, p in calls if p == "/git/blobs") == 5
+        assert ("PATCH", "/git/refs/heads/main") in calls
+        assert len(calls) == 10
+
+    @pytest.mark.parametrize("files", [
+        [{"path": "a.py", "content": "x"}, {"content": "no path"}],
+        [{"path": "a.py", "content": "x"}, "a.py"],
+        [{"path": "a.py", "content": 1}],
+        {"path": "a.py", "content": "x"},
+    ])
+    async def test_commit_files_rejects_malformed_files_before_any_request(self, files):
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(500)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        tool = GitHubTool(token="t", client=client)
+        result = await tool.execute({
+            "action": "commit_files", "owner": "o", "repo": "r", "branch": "main", "files": files,
+        })
+        assert result.success is False
+        assert "files must be" in result.error
+        assert calls == []
+
+
+class TestResponseCache:
+    async def test_disk_entries_are_capped_by_recency(self, tmp_path):
+        (tmp_path / "other.json").write_text("{}")
+        cache = ResponseCache(str(tmp_path), max_entries=2)
+        await cache.put("a", {"etag": "1"})
+        await cache.put("b", {"etag": "2"})
+        os.utime(cache._path("a"), (1, 1))
+        os.utime(cache._path("b"), (2, 2))
+        await cache.put("c", {"etag": "3"})
+
+        assert len(list(tmp_path.glob("*.response.json"))) == 2
+        assert (tmp_path / "other.json").exists()
+        fresh = ResponseCache(str(tmp_path))
+        assert await fresh.get("a") is None
+        assert (await fresh.get("b"))["etag"] == "2"
+
+    async def test_disk_io_runs_off_the_event_loop(self, tmp_path, monkeypatch):
+        import threading
+
+        threads = []
+        cache = ResponseCache(str(tmp_path))
+        original = cache._write
+        monkeypatch.setattr(
+            cache, "_write",
+            lambda *a: (threads.append(threading.current_thread()), original(*a)),
+        )
+        await cache.put("k", {"etag": "1"})
+        assert threads and threads[0] is not threading.main_thread()
+
+
+class TestRateLimiter:
+    @pytest.fixture
+    def clock(self):
+        return {"now": 1000.0, "slept": []}
+
+    @pytest.fixture
+    def limiter(self, clock):
+        async def sleep(seconds):
+            clock["slept"].append(seconds)
+            clock["now"] += seconds
+
+        return RateLimiter(burst=1, clock=lambda: clock["now"], sleep=sleep)
+
+    def _headers(self, remaining: int, reset: float) -> httpx.Response:
+        return httpx.Response(
+            200,
+            headers={
+                "X-RateLimit-Limit": "100",
+                "X-RateLimit-Remaining": str(remaining),
+                "X-RateLimit-Reset": str(int(reset)),
+            },
+        )
+
+    async def test_paces_to_sustainable_rate(self, limiter, clock):
+        # 10 requests left over 100s -> one request every 10s after the burst.
+        limiter.update(self._headers(10, clock["now"] + 100))
+        async with limiter.slot():
+            pass
+        async with limiter.slot():
+            pass
+        assert clock["slept"] and clock["slept"][-1] == pytest.approx(100 / 9, rel=0.01)
+
+    async def test_exhausted_budget_fails_fast(self, limiter, clock):
+        limiter.update(self._headers(0, clock["now"] + 3600))
+        with pytest.raises(RateLimitExceeded):
+            async with limiter.slot():
+                pass
+        assert limiter.status()["remaining"] == 0
+
+    def test_plain_forbidden_is_not_rate_limit(self, limiter):
+        assert limiter.update(httpx.Response(403, text="Resource not accessible")) is False
+
+
+class TestWebSearchTool:
+    @pytest.fixture
+    def requests(self):
+        return []
+
+    @pytest.fixture
+    def tool(self, requests):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            await asyncio.sleep(0.05)
+            if request.url.params["q"] == "boom":
+                return httpx.Response(503)
+            return httpx.Response(200, json={
+                "Heading": "Python",
+                "Abstract": "A language",
+                "AbstractURL": "https://python.org",
+                "RelatedTopics": [{"Text": "CPython", "FirstURL": "https://x/cpython"}],
+            })
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return WebSearchTool(client=client)
+
+    async def test_concurrent_identical_queries_share_one_request(self, tool, requests):
+        results = await asyncio.gather(*(
+            tool.execute({"query": q}) for q in ["python", " Python ", "PYTHON", "python"]
+        ))
+        assert len(requests) == 1
+        assert all(r.success and r.output == results[0].output for r in results)
+        assert sorted(r.metadata["cache"] for r in results) == [
+            "coalesced", "coalesced", "coalesced", "miss",
+        ]
+
+    async def test_cache_keyed_on_query_and_max_results(self, tool, requests):
+        await tool.execute({"query": "python"})
+        hit = await tool.execute({"query": "python  "})
+        assert hit.metadata["cache"] == "hit"
+        await tool.execute({"query": "python", "max_results": 1})
+        await tool.execute({"query": "python", "cache": False})
+        assert len(requests) == 3
+        assert tool.cache_stats()["hits"] == 1
+
+    async def test_failures_are_not_cached(self, tool, requests):
+        first = await tool.execute({"query": "boom"})
+        second = await tool.execute({"query": "boom"})
+        assert not first.success and not second.success
+        assert len(requests) == 2
+
+    async def test_queries_fan_out_and_merge_by_url(self, requests):
+        active = peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal active, peak
+            requests.append(request)
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+            q = request.url.params["q"]
+            if q == "bad":
+                return httpx.Response(500)
+            return httpx.Response(200, json={"RelatedTopics": [
+                {"Text": f"only {q}", "FirstURL": f"https://x/{q}"},
+                {"Text": "shared", "FirstURL": "https://x/shared/"},
+            ]})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        tool = WebSearchTool(client=client, fanout_concurrency=2)
+        result = await tool.execute({"queries": ["a", "b", "c", "a"]})
+
+        assert result.success
+        assert len(requests) == 3 and peak == 2
+        assert [q["query"] for q in result.output["queries"]] == ["a", "b", "c", "a"]
+        urls = [r["url"] for r in result.output["results"]]
+        assert urls == ["https://x/a", "https://x/shared/", "https://x/b", "https://x/c"]
+        assert result.output["results"][1]["queries"] == ["a", "b", "c", "a"]
+
+        partial = await tool.execute({"queries": ["a", "bad"]})
+        assert not partial.success
+        assert partial.error == "Queries ['bad'] failed"
+        assert [r["url"] for r in partial.output["results"]] == ["https://x/a", "https://x/shared/"]
+
+    async def test_aclose_only_closes_owned_client(self, tool):
+        await tool.aclose()
+        assert not tool._backend._client.is_closed
+        owned = WebSearchTool()
+        client = owned._backend._get_client()
+        await owned.aclose()
+        assert client.is_closed
+
+    async def test_backend_and_client_are_exclusive(self, tool):
+        with pytest.raises(ValueError, match="backend or client"):
+            WebSearchTool(backend=tool._backend, client=tool._backend._client)
+
+
+class TestLocalIndexBackend:
+    @pytest.fixture
+    def corpus(self, tmp_path):
+        docs = tmp_path / "docs"
+        (docs / "guides").mkdir(parents=True)
+        (docs / "asyncio.md").write_text("# Asyncio\nasyncio runs coroutines on an event loop.")
+        (docs / "guides" / "loops.txt").write_text(
+            "Event loop tuning\nThe event loop schedules callbacks. event loop event loop"
+        )
+        (docs / "pandas.md").write_text("# Pandas\nDataFrames for tabular data.")
+        (docs / "skip.py").write_text("event loop")
+        return docs
+
+    async def test_bm25_ranking_from_persisted_index(self, corpus, tmp_path):
+        built = LocalIndexBackend.build(str(corpus), str(tmp_path / "index"))
+        await built.aclose()
+
+        backend = LocalIndexBackend(str(tmp_path / "index"))
+        result = await backend.search("Event LOOP", 5)
+        assert [r["path"] for r in result.output["results"]] == [
+            "guides/loops.txt", "asyncio.md",
+        ]
+        assert result.output["results"][0]["title"] == "Event loop tuning"
+        assert result.output["results"][1]["url"].startswith("file://")
+
+        empty = await backend.search("kubernetes", 5)
+        assert empty.success and empty.output["results"] == []
+        await backend.aclose()
+
+    async def test_web_search_tool_with_local_backend(self, corpus, tmp_path):
+        backend = LocalIndexBackend.build(str(corpus), str(tmp_path / "index"))
+        async with WebSearchTool(backend=backend) as tool:
+            result = await tool.execute({"query": "dataframes", "max_results": 1})
+            assert result.metadata == {"cache": "miss", "backend": "local_index"}
+            assert [r["path"] for r in result.output["results"]] == ["pandas.md"]
+        # The caller's backend outlives the tool.
+        assert (await backend.search("dataframes", 1)).output["results"]
+        await backend.aclose()
+
+    async def test_empty_index(self, tmp_path):
+        (tmp_path / "docs").mkdir()
+        backend = LocalIndexBackend.build(str(tmp_path / "docs"), str(tmp_path / "index"))
+        result = await backend.search("anything", 3)
+        assert result.output["results"] == []
+        await backend.aclose()